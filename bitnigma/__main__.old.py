@@ -8,6 +8,7 @@ import sys
 
 # local module imports
 import bitnigma.machine as bitmachine
+import bitnigma.parallel as parallel
 import bitnigma.rotors as rotors
 
 
@@ -182,6 +183,25 @@ def main():
         Chunk size for reading and writing data.
         """
     )
+    parser.add_argument(
+        '--in-place', '-ix',
+        action='store_true',
+        required=False,
+        help="""
+        Overwrite the input file with its translation using memory maps,
+        instead of writing a separate output.
+        """
+    )
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        required=False,
+        help="""
+        Number of worker processes used to translate the input. Only applies
+        when both the input and output are file paths.
+        """
+    )
     parser.add_argument(
         '--benchmark', '-b',
         action='store_true',
@@ -259,6 +279,17 @@ def main():
         print('No input specified.')
         return
 
+    # Translating in place needs no output, so do it and skip ahead
+    if args.in_place:
+        if not args.input_path:
+            print('In-place translation requires an input path.')
+            return
+        input_file.close()
+        machine.translateFile(args.input_path, in_place=True)
+        if args.state_update and args.state:
+            open(args.state, 'wb').write(machine.stateGet())
+        return
+
     # Now let's work out the output
     output_file = None
 
@@ -275,31 +306,56 @@ def main():
         print('No output specified.')
         return
 
-    # get the size of the input
-    input_file.seek(0, 2)
-    input_size = input_file.tell()
-    input_file.seek(0)
+    # get the size of the input (pipes have none)
+    input_size = machine._streamSize(input_file)
 
     time_start = datetime.datetime.utcnow()
 
     # Progress callback
     def callback(current, total):
         rs = ' '.join([f'0x{r.setting:02x}' for r in machine.rotors])
-        p = min(int(current / total * 100.0), 100)
-        sys.stderr.write(
-            f'ROTORS: {rs} PROGRESS: {p}%     \r'
-        )
+        if total:
+            p = min(int(current / total * 100.0), 100)
+            sys.stderr.write(
+                f'ROTORS: {rs} PROGRESS: {p}%     \r'
+            )
+        else:
+            sys.stderr.write(
+                f'ROTORS: {rs} PROGRESS: {current} BYTES     \r'
+            )
 
     # Flip it off if needed
     if not args.progress:
         callback = None
 
-    machine.translateStream(
-        stream_in=input_file,
-        stream_out=output_file,
-        chunkSize=args.chunk_size,
-        progressCallback=callback
-    )
+    # Split files across worker processes if asked to
+    if args.jobs > 1 and args.input_path and args.output_path:
+        input_file.close()
+        output_file.close()
+        parallel.translateFile(
+            machine,
+            args.input_path,
+            args.output_path,
+            jobs=args.jobs,
+            progressCallback=callback
+        )
+
+    # Pipes can't be sized or sought, so overlap their I/O with translation
+    elif input_size is None:
+        input_size = machine.translatePipelined(
+            stream_in=input_file,
+            stream_out=output_file,
+            chunkSize=args.chunk_size,
+            progressCallback=callback
+        )
+
+    else:
+        machine.translateStream(
+            stream_in=input_file,
+            stream_out=output_file,
+            chunkSize=args.chunk_size,
+            progressCallback=callback
+        )
 
     # Add an extra return for the progress meter
     if callback:
@@ -1,18 +1,29 @@
 # stdlib imports
 import argparse
-import binascii
-import datetime
-import hashlib
+import asyncio
+import concurrent.futures
 import io
+import itertools
+import os
 import sys
-import uuid
+import time
 
 # third party import
 import click
 
 # local module imports
+import bitnigma.backends as backends
+import bitnigma.benchmark as benchmark
+import bitnigma.certificate as certificate
+import bitnigma.codebook as codebook
+import bitnigma.compression as compression
+import bitnigma.container as bitcontainer
+import bitnigma.directory as bitdirectory
 import bitnigma.machine as bitmachine
+import bitnigma.parallel as parallel
+import bitnigma.proxy as bitproxy
 import bitnigma.rotors as rotors
+import bitnigma.search as bitsearch
 
 
 def _serialize_plugboard(stack):
@@ -45,26 +56,41 @@ def cliRoot():
 @click.option('--seed', '-s', type=str)
 @click.option('--seed-file', '-sf', type=click.File('rb'))
 @click.option('--out', '-o', type=click.File('w'))
-def commandGenerate(seed, seed_file, out):
+@click.option('--count', '-n', type=int, default=1)
+@click.option('--jobs', '-j', type=int, default=1)
+@click.option('--out-dir', '-d', type=click.Path(file_okay=False))
+def commandGenerate(seed, seed_file, out, count, jobs, out_dir):
+    """
+    Generate a certificate from a seed. With --count, that many certificates
+    of the seed's family are written to --out-dir, using --jobs processes.
+    """
     # You must have either a seed or a seed file
     if seed is None and seed_file is None:
         raise click.ClickException('You must specify one of the seed options.')
+    seed = seed.encode() if seed is not None else seed_file.read()
 
-    # Create the random machine and hexlify its state
-    machine = bitmachine.RandomMachine(
-        seed_string=seed,
-        seed_file=seed_file
-    )
-    machineState = machine.stateGet()
-    stateHash = hashlib.blake2s(machineState).hexdigest()
-    stateHex = binascii.hexlify(machineState).decode()
+    # Batches are written as numbered files
+    if count > 1 or out_dir:
+        if not out_dir:
+            raise click.ClickException('--count requires --out-dir.')
+        os.makedirs(out_dir, exist_ok=True)
+        width = len(str(count - 1))
+
+        with concurrent.futures.ProcessPoolExecutor(jobs) as pool:
+            documents = pool.map(
+                certificate.generate,
+                itertools.repeat(seed, count),
+                range(count),
+                chunksize=max(count // (jobs * 4), 1)
+            )
+            for index, document in enumerate(documents):
+                name = '{0:0{1}d}.cert'.format(index, width)
+                with open(os.path.join(out_dir, name), 'w') as file:
+                    file.write(document)
+        return
 
     # Generate the certificate document
-    document = ''
-    document += str(uuid.uuid4()) + '\n'
-    document += datetime.datetime.utcnow().isoformat() + '\n'
-    document += stateHash + '\n'
-    document += stateHex
+    document = certificate.generate(seed)
 
     # Write it to the output file, if supplied
     if out:
@@ -73,6 +99,627 @@ def commandGenerate(seed, seed_file, out):
         click.echo(document)
 
 
+def _load_machine(path):
+    """
+    Load a machine from a certificate, codebook, or raw state file. Returns
+    the machine and where it came from; the certificate identifier, the
+    Codebook, or None for raw state files.
+    """
+    with open(path, 'rb') as file:
+        data = file.read(4)
+        if codebook.isCodebook(data):
+            try:
+                book = codebook.Codebook(path)
+            except ValueError as error:
+                raise click.ClickException(str(error))
+            return book.machine(), book
+        data += file.read()
+
+    identifier = None
+    if certificate.isCertificate(data):
+        try:
+            identifier, _, data = certificate.parse(data.decode('ascii'))
+        except ValueError as error:
+            raise click.ClickException(str(error))
+
+    return bitmachine.Machine(state=data), identifier
+
+
+def _save_machine(path, machine, source):
+    """Write the machine state back in the format it was loaded from"""
+    state = machine.stateGet()
+    if isinstance(source, codebook.Codebook):
+        codebook.write(state, path)
+        return
+
+    with open(path, 'wb') as file:
+        if source:
+            file.write(certificate.build(state, source).encode())
+        else:
+            file.write(state)
+
+
+def _progress_meter(interval=0.25, unit='BYTES'):
+    """Build a progress callback that redraws at most every `interval` secs"""
+    last = [None]
+
+    def callback(current, total):
+        now = time.monotonic()
+        if last[0] is not None and now - last[0] < interval and \
+                current != total:
+            return
+        last[0] = now
+
+        if total:
+            p = min(int(current / total * 100.0), 100)
+            sys.stderr.write(f'PROGRESS: {current} / {total} {unit} {p}%  \r')
+        else:
+            sys.stderr.write(f'PROGRESS: {current} {unit}  \r')
+        sys.stderr.flush()
+
+    return callback
+
+
+def _parse_address(address):
+    """Split a HOST:PORT string into a host and an integer port"""
+    host, _, port = address.rpartition(':')
+    if not host or not port.isdigit():
+        raise click.BadParameter('Expected HOST:PORT, got ' + address)
+    return host, int(port)
+
+
+# Command to run the encrypting TCP proxy
+@cliRoot.command(name='proxy')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--listen', '-l', type=str, default='127.0.0.1:8000')
+@click.option('--upstream', '-u', type=str, required=True)
+@click.option('--chunk-size', '-c', type=int, default=64 * 1024)
+def commandProxy(state_path, listen, upstream, chunk_size):
+    # Parse both of the addresses
+    listenHost, listenPort = _parse_address(listen)
+    upstreamHost, upstreamPort = _parse_address(upstream)
+
+    # Certificates, codebooks, and raw states are all accepted
+    machine, _ = _load_machine(state_path)
+
+    # Serve until interrupted
+    try:
+        asyncio.run(bitproxy.serve(
+            machine.stateGet(),
+            listenHost,
+            listenPort,
+            upstreamHost,
+            upstreamPort,
+            chunkSize=chunk_size
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+# Command to encrypt or decrypt data
+@cliRoot.command(name='translate')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--in', '-i', 'path_in', type=str, default='-')
+@click.option('--out', '-o', 'path_out', type=str, default='-')
+@click.option('--in-place', '-x', is_flag=True)
+@click.option('--engine', '-e', default='auto',
+              type=click.Choice(bitmachine.Machine.engines))
+@click.option('--jobs', '-j', type=int, default=1)
+@click.option('--chunk-size', '-c', type=str, default='1MiB')
+@click.option('--progress', '-p', is_flag=True)
+@click.option('--metrics', '-m', is_flag=True)
+@click.option('--state-update', '-u', is_flag=True)
+@click.option('--compress', '-z', type=click.Choice(compression.codecs))
+@click.option('--decompress', '-Z', is_flag=True)
+@click.option('--pipeline', '-P', is_flag=True)
+def commandTranslate(state_path, path_in, path_out, in_place, engine, jobs,
+                     chunk_size, progress, metrics, state_update, compress,
+                     decompress, pipeline):
+    """
+    Translate a file or stdin ('-') into a file or stdout ('-'). With
+    --state-update, the advanced rotor settings are saved back to the state.
+    Encrypting with --compress shrinks the data before it is translated;
+    decrypt it again with --decompress. With --pipeline, reading and writing
+    run in their own threads, overlapped with translation.
+    """
+    machine, source = _load_machine(state_path)
+    chunkSize = benchmark.parseSize(chunk_size)
+    callback = _progress_meter() if progress else None
+    if metrics:
+        machine.enableMetrics()
+
+    # Opening the output would empty an input that is the same file, so it
+    # is translated in place instead
+    if path_in != '-' and path_out != '-' and os.path.exists(path_in) and \
+            os.path.exists(path_out) and os.path.samefile(path_in, path_out):
+        if compress or decompress:
+            raise click.BadParameter(
+                'Input and output must be different files to change the size'
+            )
+        in_place = True
+
+    # Translating in place rewrites the input through memory maps
+    if in_place:
+        if path_in == '-':
+            raise click.BadParameter('--in-place requires an input path')
+        if compress or decompress:
+            raise click.BadParameter('--in-place cannot change the size')
+        machine.translateFile(
+            path_in,
+            in_place=True,
+            progressCallback=callback,
+            engine=engine
+        )
+
+    else:
+        stream_in = sys.stdin.buffer if path_in == '-' else \
+            open(path_in, 'rb')
+        stream_out = sys.stdout.buffer if path_out == '-' else \
+            open(path_out, 'wb')
+
+        # Compress before translation, and decompress after it
+        reader = stream_in
+        if compress:
+            reader = compression.CompressReader(stream_in, compress)
+        writer = stream_out
+        if decompress:
+            writer = compression.DecompressWriter(stream_out)
+
+        try:
+            # Split the work across worker processes if asked to
+            if jobs > 1:
+                # Workers map a codebook themselves rather than compiling
+                book = source if isinstance(source, codebook.Codebook) \
+                    else None
+                with parallel.WorkerPool(machine, jobs, chunkSize=chunkSize,
+                                         codebook=book,
+                                         engine=engine) as pool:
+                    done = pool.translateStream(
+                        reader,
+                        writer,
+                        progressCallback=callback,
+                        total=machine._streamSize(reader)
+                    )
+                machine.advance(done)
+
+            elif pipeline:
+                machine.translatePipelined(
+                    reader,
+                    writer,
+                    progressCallback=callback,
+                    chunkSize=chunkSize,
+                    engine=engine
+                )
+
+            else:
+                machine.translateStream(
+                    reader,
+                    writer,
+                    progressCallback=callback,
+                    chunkSize=chunkSize,
+                    engine=engine
+                )
+
+            # Make sure the compressed data was complete
+            if decompress:
+                try:
+                    writer.close()
+                except ValueError as error:
+                    raise click.ClickException(str(error))
+
+        finally:
+            stream_out.flush()
+            if path_in != '-':
+                stream_in.close()
+            if path_out != '-':
+                stream_out.close()
+
+    # Add an extra return for the progress meter
+    if callback:
+        sys.stderr.write('\n')
+
+    if metrics:
+        sys.stderr.write(machine.metrics.toPrometheus())
+
+    # Write back to the state file if asked to
+    if state_update:
+        _save_machine(state_path, machine, source)
+
+
+# Command to inspect or export a machine state
+@cliRoot.command(name='state')
+@click.argument('state_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--export', '-e', type=click.File('wb'))
+def commandState(state_path, export):
+    """
+    Print the machine held in a certificate or state file. With --export,
+    the raw state is written to a file instead.
+    """
+    machine, source = _load_machine(state_path)
+
+    if export:
+        export.write(machine.stateGet())
+        return
+
+    if isinstance(source, codebook.Codebook):
+        click.echo('CODEBOOK: ' + source.digest.hex())
+    elif source:
+        click.echo('CERTIFICATE: ' + source)
+    click.echo('PLUGBOARD: ' + ' '.join(
+        _serialize_plugboard(machine.plugboard)
+    ))
+    for i, rotor in enumerate(machine.rotors):
+        click.echo('ROTOR {0}: {1} SETTING: {2} NOTCHES: {3}'.format(
+            i + 1, rotor._name, rotor.setting,
+            ', '.join(_serialize_notches(rotor.notches))
+        ))
+    click.echo('REFLECTOR: ' + machine.reflector._name)
+
+
+# Command to compile a machine into a codebook
+@cliRoot.command(name='compile')
+@click.argument('state_path', type=click.Path(exists=True, dir_okay=False))
+@click.argument('out_path', type=click.Path(dir_okay=False))
+def commandCompile(state_path, out_path):
+    """
+    Compile a certificate or state file into a codebook, which holds every
+    lookup table of the machine and can be mapped with no setup cost.
+    """
+    machine, _ = _load_machine(state_path)
+    codebook.write(machine.stateGet(), out_path)
+
+
+# Commands to work with indexed containers
+@cliRoot.group(name='container')
+def cliContainer():
+    pass
+
+
+def _parse_blocks(text):
+    """Parse a block selection such as '0,3,5-7' into a list of indices"""
+    indices = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        try:
+            indices.extend(range(int(first), int(last or first) + 1))
+        except ValueError:
+            raise click.BadParameter('Invalid block selection ' + text)
+    return indices
+
+
+@cliContainer.command(name='encode')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--in', '-i', 'path_in', type=str, default='-')
+@click.option('--out', '-o', 'path_out', type=str, default='-')
+@click.option('--block-size', '-b', type=str, default='1MiB')
+@click.option('--engine', '-e', default='auto',
+              type=click.Choice(bitmachine.Machine.engines))
+@click.option('--jobs', '-j', type=int, default=1)
+@click.option('--state-update', '-u', is_flag=True)
+def commandContainerEncode(state_path, path_in, path_out, block_size,
+                           engine, jobs, state_update):
+    """Encrypt a file or stdin into an indexed container."""
+    machine, source = _load_machine(state_path)
+
+    stream_in = sys.stdin.buffer if path_in == '-' else open(path_in, 'rb')
+    stream_out = sys.stdout.buffer if path_out == '-' else \
+        open(path_out, 'wb')
+    try:
+        bitcontainer.encode(
+            machine,
+            stream_in,
+            stream_out,
+            blockSize=benchmark.parseSize(block_size),
+            jobs=jobs,
+            engine=engine
+        )
+    finally:
+        stream_out.flush()
+        if path_in != '-':
+            stream_in.close()
+        if path_out != '-':
+            stream_out.close()
+
+    if state_update:
+        _save_machine(state_path, machine, source)
+
+
+@cliContainer.command(name='decode')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--in', '-i', 'path_in', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--out', '-o', 'path_out', type=str, default='-')
+@click.option('--blocks', '-b', type=str)
+@click.option('--engine', '-e', default='auto',
+              type=click.Choice(bitmachine.Machine.engines))
+@click.option('--jobs', '-j', type=int, default=1)
+@click.option('--skip-corrupt', '-k', is_flag=True)
+def commandContainerDecode(state_path, path_in, path_out, blocks, engine,
+                           jobs, skip_corrupt):
+    """
+    Decrypt a container, or only the selected --blocks (such as '0,5-7').
+    With --skip-corrupt, corrupted blocks are written as zeros.
+    """
+    machine, _ = _load_machine(state_path)
+
+    stream_out = sys.stdout.buffer if path_out == '-' else \
+        open(path_out, 'wb')
+    try:
+        with open(path_in, 'rb') as stream_in:
+            reader = bitcontainer.Reader(stream_in, machine)
+            if blocks:
+                indices = _parse_blocks(blocks)
+                count = len(reader.blocks)
+                for i in indices:
+                    if i >= count:
+                        raise click.BadParameter(
+                            'No block {0} in {1} blocks'.format(i, count)
+                        )
+                corrupted = []
+                for i, data in zip(indices, reader.readBlocks(
+                        indices, not skip_corrupt, engine)):
+                    if data is None:
+                        corrupted.append(i)
+                        data = bytes(reader.blocks[i].length)
+                    stream_out.write(data)
+            else:
+                corrupted = reader.decode(
+                    stream_out,
+                    jobs=jobs,
+                    strict=not skip_corrupt,
+                    engine=engine
+                )
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    finally:
+        stream_out.flush()
+        if path_out != '-':
+            stream_out.close()
+
+    for i in corrupted:
+        click.echo('CORRUPTED BLOCK: {0}'.format(i), err=True)
+
+
+@cliContainer.command(name='verify')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def commandContainerVerify(path):
+    """Check every block of a container; exits with status 1 on damage."""
+    try:
+        with open(path, 'rb') as stream:
+            reader = bitcontainer.Reader(stream)
+            corrupted = reader.verify()
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    for i in corrupted:
+        click.echo('CORRUPTED BLOCK: {0}'.format(i))
+    click.echo('{0} of {1} blocks intact'.format(
+        len(reader.blocks) - len(corrupted), len(reader.blocks)
+    ))
+    if corrupted:
+        sys.exit(1)
+
+
+@cliContainer.command(name='info')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def commandContainerInfo(path):
+    """Print the header and index of a container."""
+    try:
+        with open(path, 'rb') as stream:
+            reader = bitcontainer.Reader(stream)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    click.echo('STATE DIGEST: ' + reader.digest.hex())
+    click.echo('BLOCK SIZE: {0}'.format(reader.blockSize))
+    for i, block in enumerate(reader.blocks):
+        click.echo('BLOCK {0}: OFFSET {1} POSITION {2} LENGTH {3} '
+                   'ROTORS {4}'.format(
+                       i, block.offset, block.position, block.length,
+                       ' '.join('0x{0:02x}'.format(s)
+                                for s in block.settings)
+                   ))
+
+
+# Command to list, test, and calibrate the translation backends
+@cliRoot.command(name='backends')
+@click.option('--state', '-s', 'state_path',
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', '-c', type=str, default='1MiB')
+@click.option('--clear', is_flag=True)
+def commandBackends(state_path, chunk_size, clear):
+    """
+    List the translation backends, and whether each is available and passes
+    its self-test. With --state, they are timed with that machine at
+    --chunk-size, and the one the 'auto' engine picks is shown. --clear
+    forgets the calibrations cached for this host first.
+    """
+    if clear:
+        backends.clearCache()
+
+    for name in backends.names():
+        backend = backends.get(name)
+        if not backend.available():
+            status = 'UNAVAILABLE'
+        elif backends.selfTest(name):
+            status = 'OK'
+        else:
+            status = 'FAILED'
+        click.echo('{0:<12} {1:<12} {2}'.format(
+            name, status, backend.description
+        ))
+
+    if state_path:
+        machine, _ = _load_machine(state_path)
+        chunkSize = benchmark.parseSize(chunk_size)
+        costs = backends.calibrate(machine, chunkSize)
+        click.echo()
+        for name, cost in sorted(costs.items(), key=lambda c: c[1]):
+            click.echo('{0:<12} {1:.1f} ns/byte'.format(name, cost))
+        click.echo('AUTO: ' + backends.select(machine, chunkSize))
+
+
+# Command to recover rotor settings from a known plaintext
+@cliRoot.command(name='search')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--crib', '-k', type=str, default=None)
+@click.option('--crib-file', '-K', type=click.File('rb'), default=None)
+@click.option('--in', '-i', 'stream_in', type=click.File('rb'), default='-')
+@click.option('--rotor', '-r', 'specs', multiple=True)
+@click.option('--vary', '-v', type=int, default=None)
+@click.option('--jobs', '-j', type=int, default=None)
+@click.option('--checkpoint', '-c', type=click.Path(dir_okay=False))
+@click.option('--progress', '-p', is_flag=True)
+@click.option('--state-update', '-u', is_flag=True)
+def commandSearch(state_path, crib, crib_file, stream_in, specs, vary, jobs,
+                  checkpoint, progress, state_update):
+    """
+    Find the rotor settings a ciphertext (--in) was encrypted from, given the
+    plaintext it starts with (--crib or --crib-file). By default every
+    setting of every rotor is tried; --vary N keeps rotors N and up at their
+    settings in the state, and --rotor INDEX=VALUES (such as 0=0x10-0x1f or
+    2=7,9) limits a rotor. --checkpoint saves progress to resume from. With
+    --state-update, a single match is saved back to the state.
+    """
+    if (crib is None) == (crib_file is None):
+        raise click.ClickException('Specify one of --crib or --crib-file.')
+    crib = crib.encode() if crib is not None else crib_file.read()
+
+    machine, source = _load_machine(state_path)
+    ciphertext = stream_in.read(len(crib))
+    callback = _progress_meter(unit='CANDIDATES') if progress else None
+
+    try:
+        space = bitsearch.parseSpace(machine, specs, vary)
+        matches = bitsearch.search(
+            machine,
+            crib,
+            ciphertext,
+            space=space,
+            jobs=jobs,
+            progressCallback=callback,
+            checkpoint=checkpoint
+        )
+    except (ValueError, RuntimeError) as error:
+        raise click.ClickException(str(error))
+
+    if callback:
+        sys.stderr.write('\n')
+
+    for settings in matches:
+        click.echo('MATCH: ' + ' '.join(
+            '0x{0:02x}'.format(setting) for setting in settings
+        ))
+    if not matches:
+        click.echo('NO MATCHES', err=True)
+        sys.exit(1)
+
+    if state_update:
+        if len(matches) > 1:
+            raise click.ClickException(
+                'Several matches; use a longer crib to update the state.'
+            )
+        machine.restore(matches[0])
+        _save_machine(state_path, machine, source)
+
+
+# Commands to translate whole directory trees
+@cliRoot.group(name='directory')
+def cliDirectory():
+    pass
+
+
+@cliDirectory.command(name='encrypt')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.argument('root_in', type=click.Path(exists=True, file_okay=False))
+@click.argument('root_out', type=click.Path(file_okay=False))
+@click.option('--manifest', '-m', 'manifest_path', required=True,
+              type=click.Path(dir_okay=False))
+@click.option('--engine', '-e', default='auto',
+              type=click.Choice(bitmachine.Machine.engines))
+@click.option('--jobs', '-j', type=int, default=None)
+@click.option('--progress', '-p', is_flag=True)
+def commandDirectoryEncrypt(state_path, root_in, root_out, manifest_path,
+                            engine, jobs, progress):
+    """
+    Encrypt every file of a directory tree into another, and write a
+    manifest that allows any file to be decrypted on its own.
+    """
+    machine, _ = _load_machine(state_path)
+    callback = _progress_meter(unit='FILES') if progress else None
+
+    try:
+        manifest = bitdirectory.translateTree(
+            machine.stateGet(),
+            root_in,
+            root_out,
+            jobs=jobs,
+            progressCallback=callback,
+            engine=engine
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    bitdirectory.writeManifest(manifest, manifest_path)
+
+    if callback:
+        sys.stderr.write('\n')
+
+
+@cliDirectory.command(name='decrypt')
+@click.option('--state', '-s', 'state_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.argument('root_in', type=click.Path(exists=True, file_okay=False))
+@click.argument('root_out', type=click.Path(file_okay=False))
+@click.option('--manifest', '-m', 'manifest_path', required=True,
+              type=click.Path(exists=True, dir_okay=False))
+@click.option('--path', '-f', 'paths', multiple=True)
+@click.option('--engine', '-e', default='auto',
+              type=click.Choice(bitmachine.Machine.engines))
+@click.option('--jobs', '-j', type=int, default=None)
+@click.option('--progress', '-p', is_flag=True)
+def commandDirectoryDecrypt(state_path, root_in, root_out, manifest_path,
+                            paths, engine, jobs, progress):
+    """
+    Decrypt the files of an encrypted tree listed in its manifest, or only
+    the given --path entries, checking each against its digest. Exits with
+    status 1 if any file does not match.
+    """
+    machine, _ = _load_machine(state_path)
+    callback = _progress_meter(unit='FILES') if progress else None
+
+    try:
+        mismatched = bitdirectory.translateManifest(
+            machine.stateGet(),
+            bitdirectory.readManifest(manifest_path),
+            root_in,
+            root_out,
+            paths=paths or None,
+            jobs=jobs,
+            progressCallback=callback,
+            engine=engine
+        )
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    if callback:
+        sys.stderr.write('\n')
+
+    for path in mismatched:
+        click.echo('DIGEST MISMATCH: ' + path, err=True)
+    if mismatched:
+        sys.exit(1)
+
+
+# Benchmark suite commands
+cliRoot.add_command(benchmark.cliBenchmark, name='benchmark')
+
+
 # If this is the main script, invoke the CLI
 if __name__ == '__main__':
     cliRoot()
@@ -0,0 +1,311 @@
+# stdlib imports
+import collections
+import hashlib
+import json
+import os
+import platform
+import time
+
+# third party imports
+
+# local module imports
+import bitnigma.io as bitio
+import bitnigma.machine as bitmachine
+import bitnigma.vectorized as vectorized
+
+
+# A translation backend; `translate(machine, chunk_in, chunk_out)` does the
+# work of `Machine.translateInto`, and `available()` says if it can run here
+Backend = collections.namedtuple(
+    'Backend',
+    ['name', 'translate', 'available', 'description', 'automatic']
+)
+
+# Registered backends, in registration order
+_registry = collections.OrderedDict()
+
+# Self-test vector; a fixed machine with dense notches, so stepping
+# cascades are exercised, and the expected digest of its output followed by
+# its final settings
+_testSeed = b'bitnigma.backends.selftest'
+_testConfig = {
+    'rotor_count': 6,
+    'rotor_notch_min': 32,
+    'rotor_notch_max': 96
+}
+_testSize = 4096
+_testDigest = \
+    'beee5c6ffe09da756c3a0622f71523691bfcd41bdfc8e579ac8d3c8a207623f3'
+
+# Self-test results, by backend name
+_verified = {}
+
+# Calibration; the size of the probe that first weeds out backends more
+# than `_probeMargin` times slower than the best, the largest sample the
+# rest are timed with, the number of timed runs, and the version of the
+# cache file layout
+_probeSize = 512
+_probeMargin = 8
+_sampleSize = 16 * 1024
+_runs = 3
+_cacheVersion = 1
+
+# Chosen backends, by shape key; loaded from the host cache on first use
+_choices = None
+
+
+def register(name, translate, available=None, description='',
+             automatic=True):
+    """
+    Register a translation backend under a name, replacing any backend of
+    the same name. Backends with `automatic` off are never picked by the
+    'auto' engine, only when named.
+    """
+    _registry[name] = Backend(
+        name,
+        translate,
+        available or (lambda: True),
+        description,
+        automatic
+    )
+
+    # A replaced backend has to be tested and calibrated again
+    _verified.pop(name, None)
+    if _choices is not None:
+        _choices.clear()
+
+
+def get(name):
+    """Return the registered backend of a name."""
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(str(name) + ' is not a valid engine name')
+
+
+def names():
+    """List the names of every registered backend."""
+    return list(_registry)
+
+
+def available():
+    """List the names of the backends that can run on this host."""
+    return [name for name, backend in _registry.items()
+            if backend.available()]
+
+
+def _testVector():
+    """Build the self-test machine and input"""
+    machine = bitmachine.RandomMachine(
+        seed_string=_testSeed,
+        override=_testConfig
+    )
+    data = bytes(range(256)) * (_testSize // 256)
+    return machine, data
+
+
+def _testResult(machine, output):
+    """Digest of a self-test output and the settings it left"""
+    return hashlib.blake2s(
+        bytes(output) + bytes(machine.snapshot())
+    ).hexdigest()
+
+
+def selfTest(name):
+    """
+    Check that a backend translates the self-test vector exactly as the
+    reference backend did when the vector was recorded, and leaves the
+    machine at the same settings. The result is remembered for the rest of
+    the process.
+    """
+    if name in _verified:
+        return _verified[name]
+
+    backend = get(name)
+    if not backend.available():
+        _verified[name] = False
+        return False
+
+    machine, data = _testVector()
+    output = bytearray(len(data))
+    try:
+        backend.translate(machine, data, output)
+        passed = _testResult(machine, output) == _testDigest
+    except Exception:
+        passed = False
+
+    _verified[name] = passed
+    return passed
+
+
+def _bucket(value):
+    """Round up to a power of two, so similar shapes share a calibration"""
+    return 1 << max(value - 1, 0).bit_length()
+
+
+def shapeKey(machine, chunkSize):
+    """Key of the machine shape a calibration applies to."""
+    return 'rotors={0}/chunk={1}'.format(
+        _bucket(len(machine.rotors)),
+        _bucket(chunkSize)
+    )
+
+
+def hostKey():
+    """Identify the host and interpreter that calibrations were made on."""
+    return '/'.join([
+        platform.node(),
+        platform.machine(),
+        platform.python_implementation(),
+        platform.python_version(),
+        vectorized.numpy.__version__ if vectorized.available() else 'none'
+    ])
+
+
+def cachePath():
+    """Path of the per-host calibration cache."""
+    root = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'bitnigma', 'backends.json')
+
+
+def _loadChoices():
+    """Read the calibrations of this host from the cache, if there are any"""
+    try:
+        with open(cachePath(), 'r') as file:
+            cache = json.load(file)
+        if cache.get('version') == _cacheVersion and \
+                cache.get('host') == hostKey():
+            return dict(cache['choices'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return {}
+
+
+def _saveChoices(choices):
+    """Write the calibrations of this host to the cache, best effort"""
+    path = cachePath()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with bitio.atomicWrite(path, 'w') as file:
+            json.dump({
+                'version': _cacheVersion,
+                'host': hostKey(),
+                'choices': choices
+            }, file, indent=1)
+    except OSError:
+        pass
+
+
+def calibrate(machine, chunkSize, candidates=None):
+    """
+    Time backends translating a chunk with a machine, and return their cost
+    in nanoseconds per byte, by name.
+
+    Chunks are timed at `chunkSize` bytes, up to a 16KiB sample, after a
+    short probe has dropped the backends that are far behind; those are
+    left out of the result. Only the automatic backends that pass the
+    self-test are timed, unless `candidates` names others. The machine is
+    left where it was.
+    """
+    if candidates is None:
+        candidates = [name for name, backend in _registry.items()
+                      if backend.automatic and selfTest(name)]
+
+    size = max(min(chunkSize, _sampleSize), 1)
+    data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    output = bytearray(size)
+    base = machine.snapshot()
+
+    def measure(names, length, runs):
+        costs = {}
+        with memoryview(data)[:length] as chunk_in, \
+                memoryview(output)[:length] as chunk_out:
+            for name in names:
+                translate = get(name).translate
+                best = None
+                for i in range(runs):
+                    machine.restore(base)
+                    start = time.perf_counter_ns()
+                    translate(machine, chunk_in, chunk_out)
+                    elapsed = time.perf_counter_ns() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                costs[name] = best / length
+        return costs
+
+    try:
+        # Weed out the slow backends cheaply before timing the rest
+        if len(candidates) > 1:
+            costs = measure(candidates, min(size, _probeSize), 1)
+            limit = min(costs.values()) * _probeMargin
+            candidates = [name for name in candidates if costs[name] <= limit]
+
+        return measure(candidates, size, _runs)
+
+    finally:
+        machine.restore(base)
+
+
+def select(machine, chunkSize):
+    """
+    Pick the fastest backend for a machine and chunk size.
+
+    Choices are made by `calibrate` once per shape (see `shapeKey`), and
+    cached per host in `cachePath()`, so later processes start without
+    calibrating again.
+    """
+    global _choices
+    if _choices is None:
+        _choices = _loadChoices()
+
+    key = shapeKey(machine, chunkSize)
+    name = _choices.get(key)
+    if name in _registry and _registry[name].automatic and selfTest(name):
+        return name
+
+    costs = calibrate(machine, _bucket(chunkSize))
+    if not costs:
+        return 'reference'
+    name = min(costs, key=costs.get)
+
+    _choices[key] = name
+    _saveChoices(_choices)
+    return name
+
+
+def clearCache():
+    """Forget every calibration, in this process and in the host cache."""
+    global _choices
+    _choices = {}
+    try:
+        os.unlink(cachePath())
+    except FileNotFoundError:
+        pass
+
+
+# The built in backends
+register(
+    'reference',
+    lambda machine, chunk_in, chunk_out:
+        machine._translateReference(chunk_in, chunk_out),
+    description='every byte through Machine.translatePin',
+    automatic=False
+)
+register(
+    'composite',
+    lambda machine, chunk_in, chunk_out:
+        machine._translateComposite(chunk_in, chunk_out),
+    description='cached tables of the inner rotor stack'
+)
+register(
+    'flat',
+    lambda machine, chunk_in, chunk_out:
+        machine._translateFlat(chunk_in, chunk_out),
+    description='loops over flat tables, for deep stacks'
+)
+register(
+    'numpy',
+    vectorized.translateInto,
+    available=vectorized.available,
+    description='whole chunks at once (requires NumPy)'
+)
@@ -1,82 +1,457 @@
 # stdlib imports
-import datetime
 import io
-import secrets
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import sys
 import time
 
 # vendor imports
+import click
 
 # local imports
-import bitnigma.machine
+import bitnigma.backends as backends
+import bitnigma.machine as bitmachine
+import bitnigma.reflectors as reflectors
+import bitnigma.rotors as rotors
+import bitnigma.vectorized as vectorized
 
 
-print('Creating a randomized standard three rotor machine...')
-seed = datetime.datetime.utcnow().isoformat()
-print('  seed string:', seed)
-machine = bitnigma.machine.RandomMachine(
-    seed_string=seed,
+# Sizes of the generated pattern blocks that larger inputs are cycled from
+_blockSize = 1024 ** 2
+
+# Filler for the 'text' data pattern
+_textSample = (
+    b'{"time": "2017-06-01T12:00:00", "level": "info", '
+    b'"message": "request served", "status": 200, "bytes": 5120}\n'
 )
-initialState = machine.stateGet()
-print('  state recorded')
-
-
-iterations = 10
-stages = [
-    ('1 KiB', 1024 * 1),
-    ('32 KiB', 1024 * 32),
-    # ('256 KiB', 1024 * 256),
-    # ('1 MiB', (1024 ** 2) * 1),
-    # ('2 MiB', (1024 ** 2) * 2),
-    # ('4 MiB', (1024 ** 2) * 2),
-]
-
-results = []
-
-for i, (stageLabel, stageBytes) in enumerate(stages):
-    print(f'Stage {i + 1}: {iterations} iterations of {stageLabel}')
-    results.append([])
-    for j in range(iterations):
-        print(f'  Iteration {j + 1}')
-        print(f'    generating {stageLabel} of random data...')
-        source = io.BytesIO(
-            secrets.token_bytes(stageBytes)
+
+# Recognised size suffixes
+_sizeUnits = {
+    'b': 1,
+    'kib': 1024,
+    'mib': 1024 ** 2,
+    'gib': 1024 ** 3
+}
+
+
+def parseSize(text):
+    """Parse a size such as '64KiB' or '1GiB' into a number of bytes."""
+    text = text.strip().lower()
+    for unit, factor in sorted(_sizeUnits.items(), key=lambda u: -len(u[0])):
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def formatSize(size):
+    """Format a number of bytes using the largest whole binary unit."""
+    for unit, factor in (('GiB', 1024 ** 3), ('MiB', 1024 ** 2),
+                         ('KiB', 1024)):
+        if size >= factor and size % factor == 0:
+            return str(size // factor) + unit
+    return str(size) + 'B'
+
+
+def buildMachine(rotorCount, notchCount, seed):
+    """Build a deterministic machine with evenly sized notch sets."""
+    generator = random.Random(seed)
+    population = list(range(256))
+
+    # Rotors with exactly `notchCount` notches each
+    rotorStack = [
+        rotors.Custom(
+            wiring=bytes(generator.sample(population, 256)),
+            notches=generator.sample(population, notchCount),
+            setting=generator.randrange(256)
+        )
+        for i in range(rotorCount)
+    ]
+
+    # A reflector that pairs up every pin
+    shuffled = generator.sample(population, 256)
+    wiring = bytearray(256)
+    for x, y in zip(shuffled[0::2], shuffled[1::2]):
+        wiring[x] = y
+        wiring[y] = x
+
+    return bitmachine.Machine(
+        plugboardStack=[shuffled[i:i + 2] for i in range(0, 64, 2)],
+        rotorStack=rotorStack,
+        reflector=reflectors.Custom(bytes(wiring))
+    )
+
+
+def patternBlock(pattern, seed):
+    """Generate one block of a named data pattern."""
+    if pattern == 'random':
+        generator = random.Random(seed)
+        return generator.getrandbits(_blockSize * 8).to_bytes(
+            _blockSize, 'little'
+        )
+    elif pattern == 'zeros':
+        return bytes(_blockSize)
+    elif pattern == 'cycle':
+        return bytes(range(256)) * (_blockSize // 256)
+    elif pattern == 'text':
+        repeats = -(-_blockSize // len(_textSample))
+        return (_textSample * repeats)[:_blockSize]
+    raise ValueError(pattern + ' is not a valid data pattern')
+
+
+class PatternStream(io.RawIOBase):
+    """Readable stream of `size` bytes, cycled from a pattern block."""
+
+    def __init__(self, block, size):
+        super().__init__()
+        self._block = memoryview(block)
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position,
+                io.SEEK_END: self._size}[whence]
+        self._position = min(max(base + offset, 0), self._size)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def readinto(self, buffer):
+        with memoryview(buffer) as view:
+            count = min(len(view), self._size - self._position)
+            done = 0
+            while done < count:
+                start = (self._position + done) % len(self._block)
+                length = min(count - done, len(self._block) - start)
+                view[done:done + length] = self._block[start:start + length]
+                done += length
+        self._position += count
+        return count
+
+
+class NullStream(io.RawIOBase):
+    """Writable stream that discards everything."""
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return len(data)
+
+
+def patternWindow(block, chunkSize):
+    """
+    Cycle a pattern block out to one chunk past its end, so a chunk starting
+    anywhere in the block can be viewed without wrapping around.
+    """
+    length = len(block) + chunkSize
+    repeats = -(-length // len(block))
+    return memoryview(bytes(block) * repeats)[:length]
+
+
+def _chunks(window, size, chunkSize):
+    """Yield views of the successive chunks of `size` cycled pattern bytes"""
+    period = len(window) - chunkSize
+    for offset in range(0, size, chunkSize):
+        start = offset % period
+        yield window[start:start + min(chunkSize, size - offset)]
+
+
+def _runPin(machine, block, window, size, chunkSize, engine):
+    """Translate byte by byte through `Machine.translatePin`."""
+    translatePin = machine.translatePin
+    for chunk in _chunks(window, size, chunkSize):
+        for byte in chunk:
+            translatePin(byte)
+
+
+def _runChunk(machine, block, window, size, chunkSize, engine):
+    """Translate the input as successive `translateChunk` calls."""
+    for chunk in _chunks(window, size, chunkSize):
+        machine.translateChunk(chunk, engine)
+
+
+def _runInto(machine, block, window, size, chunkSize, engine):
+    """Translate the input with `translateInto`, into one reused buffer."""
+    output = bytearray(chunkSize)
+    for chunk in _chunks(window, size, chunkSize):
+        machine.translateInto(chunk, output, engine)
+
+
+def _runStream(machine, block, window, size, chunkSize, engine):
+    """Translate a generated stream into a discarding one."""
+    machine.translateStream(
+        PatternStream(block, size),
+        NullStream(),
+        chunkSize=chunkSize,
+        engine=engine
+    )
+
+
+# Translation paths, and whether each one takes an engine
+paths = {
+    'pin': (_runPin, False),
+    'chunk': (_runChunk, True),
+    'into': (_runInto, True),
+    'stream': (_runStream, True)
+}
+
+
+def engines():
+    """List the translation engines usable on this host."""
+    return backends.available()
+
+
+def summarize(samples, size):
+    """Reduce timing samples in nanoseconds to summary statistics."""
+    ordered = sorted(samples)
+
+    def percentile(p):
+        index = (len(ordered) - 1) * p / 100
+        lower = int(index)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+            index - lower
         )
-        noop = io.BytesIO()
-        print('    resetting machine state...')
-        machine.stateSet(initialState)
-        print('    running translation...')
+
+    median = percentile(50)
+    return {
+        'min_ns': ordered[0],
+        'max_ns': ordered[-1],
+        'mean_ns': statistics.mean(ordered),
+        'p50_ns': median,
+        'p90_ns': percentile(90),
+        'p99_ns': percentile(99),
+        'stdev_ns': statistics.pstdev(ordered),
+        'ns_per_byte': median / size,
+        'mib_per_s': (size / 1024 ** 2) / (median / 1e9) if median else 0.0
+    }
+
+
+def caseKey(case):
+    """Build a stable string key identifying a benchmark case."""
+    return '/'.join('{0}={1}'.format(k, case[k]) for k in sorted(case))
+
+
+def runCase(case, iterations, warmup, seed):
+    """Time one benchmark case, returning its raw samples in nanoseconds."""
+    machine = buildMachine(case['rotors'], case['notches'], seed)
+    block = patternBlock(case['pattern'], seed)
+    function, _ = paths[case['path']]
+
+    # The input is prepared up front, so only translation is timed
+    window = patternWindow(block, case['chunk_size'])
+
+    samples = []
+    for i in range(warmup + iterations):
+        # Every run starts from the same rotor settings
+        machine.breakGo()
+
         start = time.perf_counter_ns()
-        machine.translateStream(source, noop)
-        end = time.perf_counter_ns()
-        results[i].append(end - start)
-        print(f'    translation took ~{end - start}ns')
+        function(
+            machine,
+            block,
+            window,
+            case['size'],
+            case['chunk_size'],
+            case['engine']
+        )
+        stop = time.perf_counter_ns()
+
+        if i >= warmup:
+            samples.append(stop - start)
+
+    return samples
+
+
+def buildCases(sizes, rotorCounts, notchCounts, chunkSizes, patterns,
+               pathNames, engineNames):
+    """Expand the benchmark matrix into a list of cases."""
+    cases = []
+    for size, rotorCount, notchCount, chunkSize, pattern, path in \
+            itertools.product(sizes, rotorCounts, notchCounts, chunkSizes,
+                              patterns, pathNames):
+        usesEngine = paths[path][1]
+        for engine in (engineNames if usesEngine else ['reference']):
+            cases.append({
+                'size': size,
+                'rotors': rotorCount,
+                'notches': notchCount,
+                'chunk_size': chunkSize,
+                'pattern': pattern,
+                'path': path,
+                'engine': engine
+            })
+    return cases
+
+
+def hostInfo():
+    """Describe the host and interpreter the benchmark ran on."""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': vectorized.numpy.__version__ if vectorized.available()
+        else None
+    }
+
+
+def _csv(convert):
+    """Build a click callback that splits a comma separated option."""
+    def callback(ctx, param, value):
+        try:
+            return [convert(v) for v in value.split(',') if v.strip()]
+        except ValueError as error:
+            raise click.BadParameter(str(error))
+    return callback
+
+
+@click.group()
+def cliBenchmark():
+    pass
+
+
+@cliBenchmark.command(name='run')
+@click.option('--sizes', default='1KiB,64KiB,1MiB', callback=_csv(parseSize))
+@click.option('--rotors', 'rotorCounts', default='3,8', callback=_csv(int))
+@click.option('--notches', 'notchCounts', default='1,16',
+              callback=_csv(int))
+@click.option('--chunk-sizes', default='128,65536',
+              callback=_csv(parseSize))
+@click.option('--patterns', default='random,text', callback=_csv(str))
+@click.option('--paths', 'pathNames', default='pin,chunk,stream',
+              callback=_csv(str))
+@click.option('--engines', 'engineNames', default=None)
+@click.option('--iterations', '-n', type=int, default=5)
+@click.option('--warmup', '-w', type=int, default=1)
+@click.option('--seed', type=int, default=0)
+@click.option('--out', '-o', type=click.File('w'), default='-')
+def commandRun(sizes, rotorCounts, notchCounts, chunk_sizes, patterns,
+               pathNames, engineNames, iterations, warmup, seed, out):
+    """Run the benchmark matrix and write the results as JSON."""
+    for path in pathNames:
+        if path not in paths:
+            raise click.BadParameter(path + ' is not a valid path')
+    engineNames = engineNames.split(',') if engineNames else engines()
+    for engine in engineNames:
+        if engine not in engines():
+            raise click.BadParameter(engine + ' is not an available engine')
+
+    cases = buildCases(sizes, rotorCounts, notchCounts, chunk_sizes,
+                       patterns, pathNames, engineNames)
+    _runCases(cases, iterations, warmup, seed, out)
+
+
+def _runCases(cases, iterations, warmup, seed, out):
+    """Run benchmark cases, reporting progress, and write the results."""
+    results = []
+    for i, case in enumerate(cases):
+        samples = runCase(case, iterations, warmup, seed)
+        stats = summarize(samples, case['size'])
+        results.append({
+            'key': caseKey(case),
+            'case': case,
+            'samples_ns': samples,
+            'stats': stats
+        })
+        click.echo(
+            '[{0}/{1}] {2}: {3:.2f} MiB/s, {4:.1f} ns/byte'.format(
+                i + 1, len(cases), caseKey(case),
+                stats['mib_per_s'], stats['ns_per_byte']
+            ),
+            err=True
+        )
+
+    json.dump({
+        'host': hostInfo(),
+        'timestamp': time.time(),
+        'iterations': iterations,
+        'warmup': warmup,
+        'seed': seed,
+        'results': results
+    }, out, indent=2)
+    out.write('\n')
+
+
+@cliBenchmark.command(name='depth')
+@click.option('--rotors', 'rotorCounts', default='3,8,32,128,256',
+              callback=_csv(int))
+@click.option('--notches', 'notchCounts', default='1,16',
+              callback=_csv(int))
+@click.option('--size', default='16KiB', callback=lambda c, p, v:
+              parseSize(v))
+@click.option('--engines', 'engineNames', default=None)
+@click.option('--iterations', '-n', type=int, default=3)
+@click.option('--warmup', '-w', type=int, default=1)
+@click.option('--seed', type=int, default=0)
+@click.option('--out', '-o', type=click.File('w'), default='-')
+def commandDepth(rotorCounts, notchCounts, size, engineNames, iterations,
+                 warmup, seed, out):
+    """
+    Measure how each engine scales with the depth of the rotor stack,
+    translating in place, and write the results as JSON.
+    """
+    engineNames = engineNames.split(',') if engineNames else engines()
+    for engine in engineNames:
+        if engine not in engines():
+            raise click.BadParameter(engine + ' is not an available engine')
+
+    cases = buildCases([size], rotorCounts, notchCounts, [size], ['random'],
+                       ['into'], engineNames)
+    _runCases(cases, iterations, warmup, seed, out)
+
 
-        del source, noop
-        # exit()
+@cliBenchmark.command(name='compare')
+@click.argument('baseline', type=click.File('r'))
+@click.argument('candidate', type=click.File('r'))
+@click.option('--threshold', '-t', type=float, default=0.10)
+def commandCompare(baseline, candidate, threshold):
+    """
+    Compare two benchmark runs by median ns/byte. Exits with status 1 if any
+    case got slower by more than the threshold fraction.
+    """
+    before = {r['key']: r['stats'] for r in json.load(baseline)['results']}
+    after = {r['key']: r['stats'] for r in json.load(candidate)['results']}
 
-    print()
+    regressions = 0
+    for key in sorted(set(before) & set(after)):
+        old = before[key]['ns_per_byte']
+        new = after[key]['ns_per_byte']
+        change = (new - old) / old if old else 0.0
 
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  improved'
 
-print('Results;')
-for i, (stageLabel, stageBytes) in enumerate(stages):
-    mean = sum(results[i]) / len(results[i])
-    seconds = mean / 1e9
-    print(f'  {stageLabel} took on average {round(seconds, 2)}s')
+        click.echo('{0:+7.1%}  {1:10.1f} -> {2:10.1f} ns/byte  {3}{4}'.format(
+            change, old, new, key, flag
+        ))
 
+    for key in sorted(set(before) ^ set(after)):
+        click.echo('unmatched  ' + key)
 
-nspbSum = 0
-nspbCount = 0
-for i, (stageLabel, stageBytes) in enumerate(stages):
-    for ns in results[i]:
-        nspbSum += ns / stageBytes
-        nspbCount += 1
+    if regressions:
+        click.echo('{0} regression(s) over {1:.0%}'.format(
+            regressions, threshold
+        ), err=True)
+        sys.exit(1)
 
-nspb = nspbSum / nspbCount
-spb = nspb / 1e9
-bps = 1 / spb
 
-print()
-print('Speed ratings;')
-for i, measure in enumerate(['B', 'KiB', 'MiB']):
-    rate = bps / (1024 ** i)
-    print(f'  {round(rate, 2)} {measure}/s')
+# If this is the main script, invoke the CLI
+if __name__ == '__main__':
+    cliBenchmark()
@@ -0,0 +1,79 @@
+# stdlib imports
+import binascii
+import datetime
+import hashlib
+import uuid
+
+# third party imports
+
+# local module imports
+import bitnigma.machine as bitmachine
+
+
+def build(state, identifier=None, created=None):
+    """
+    Build a certificate document around a machine state.
+
+    The document is four lines; a UUID, the UTC creation time, the blake2s
+    hash of the state, and the state itself in hex.
+    """
+    if identifier is None:
+        identifier = str(uuid.uuid4())
+    if created is None:
+        created = datetime.datetime.utcnow().isoformat()
+
+    return '\n'.join([
+        identifier,
+        created,
+        hashlib.blake2s(state).hexdigest(),
+        binascii.hexlify(state).decode()
+    ])
+
+
+def parse(document):
+    """
+    Parse a certificate document into its (identifier, created, state).
+
+    Raises a ValueError if the document is malformed, or if the state does
+    not match its hash.
+    """
+    lines = document.split()
+    if len(lines) != 4:
+        raise ValueError('Malformed certificate')
+    identifier, created, stateHash, stateHex = lines
+
+    try:
+        state = binascii.unhexlify(stateHex)
+    except binascii.Error:
+        raise ValueError('Malformed certificate state')
+
+    if hashlib.blake2s(state).hexdigest() != stateHash.lower():
+        raise ValueError('Certificate state does not match its hash')
+
+    return identifier, created, state
+
+
+def isCertificate(data):
+    """Return True if the raw bytes of a file look like a certificate."""
+    try:
+        lines = data.decode('ascii').split()
+        uuid.UUID(lines[0])
+    except (UnicodeDecodeError, IndexError, ValueError):
+        return False
+    return len(lines) == 4
+
+
+def loadState(data):
+    """Return the machine state held in a certificate or raw state file."""
+    if isCertificate(data):
+        return parse(data.decode('ascii'))[2]
+    return data
+
+
+def generate(seed, index=0):
+    """
+    Build the certificate of a `RandomMachine`, the `index`th machine of the
+    family generated by a seed string or bytes.
+    """
+    machine = bitmachine.RandomMachine(seed_string=seed, index=index)
+    return build(machine.stateGet())
@@ -0,0 +1,167 @@
+# stdlib imports
+import hashlib
+import mmap
+import struct
+import sys
+
+# third party imports
+
+# local module imports
+import bitnigma.io as bitio
+import bitnigma.machine as bitmachine
+import bitnigma.rotors as rotors
+
+
+# File header; magic, version, big endian flag, section count, state length
+_header = struct.Struct('<4sHBxII')
+_magic = b'BNCB'
+_version = 1
+_digestSize = 32
+
+# Header of each table section; the number of notches
+_sectionHeader = struct.Struct('<H6x')
+
+# Layout of the rest of a section, as (name, size) in file order
+_sectionFields = (
+    ('wiring', 256),
+    ('notchSet', 256),
+    ('notches', 256),
+    ('wiring_forward', 512),
+    ('wiring_reverse', 512),
+    ('notch_counts', 520),
+    ('pinBlock', 131072)
+)
+_sectionSize = _sectionHeader.size + sum(size for _, size in _sectionFields)
+
+
+def _pad(size):
+    """Round a size up to a multiple of 8 bytes"""
+    return -(-size // 8) * 8
+
+
+def isCodebook(data):
+    """Return True if the leading bytes of a file look like a codebook."""
+    return data[:len(_magic)] == _magic
+
+
+def _sections(machine):
+    """Collect the distinct Tables used by a machine's rotors and reflector"""
+    found = {}
+    for rotor in machine.rotors + [machine.reflector]:
+        found.setdefault(id(rotor.tables), rotor.tables)
+    return list(found.values())
+
+
+def write(state, path):
+    """
+    Compile a `Machine.stateGet()` blob into a codebook file.
+
+    The codebook holds the state along with every lookup table its rotors
+    and reflector need, including the pin tables of all 256 settings, so
+    that `Codebook` can map it and start translating without building any
+    tables. The file is replaced atomically, so it is safe to rewrite a
+    codebook that is currently mapped.
+    """
+    machine = bitmachine.Machine(state=state)
+    sections = _sections(machine)
+
+    # Everything after the digest
+    payload = bytearray(state)
+    payload.extend(bytes(_pad(len(state)) - len(state)))
+    for tables in sections:
+        notchSet = bytes(i for i in range(256) if tables.notches[i])
+        payload.extend(_sectionHeader.pack(len(notchSet)))
+        payload.extend(tables.wiring)
+        payload.extend(notchSet.ljust(256, b'\x00'))
+        payload.extend(tables.notches)
+        payload.extend(tables.wiring_forward)
+        payload.extend(tables.wiring_reverse)
+        payload.extend(bytes(tables.notch_counts).ljust(520, b'\x00'))
+        payload.extend(tables.pinBlock())
+
+    header = _header.pack(
+        _magic,
+        _version,
+        sys.byteorder == 'big',
+        len(sections),
+        len(state)
+    )
+
+    # Write beside the destination, then swap it into place
+    with bitio.atomicWrite(path) as file:
+        file.write(header)
+        file.write(hashlib.blake2s(payload).digest())
+        file.write(payload)
+
+
+class Codebook:
+    """
+    A compiled machine, memory-mapped from a codebook file.
+
+    While a Codebook is alive its tables are registered with
+    `rotors.compileTables`, so every machine built from its state, in any
+    way, shares the mapped tables instead of compiling its own.
+    """
+
+    def __init__(self, path, verify=True):
+        """
+        Map a codebook file. The digest of the whole file is checked first,
+        so corrupted tables are never used; with `verify` off, only its
+        header is.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+
+        # Check the header
+        if len(view) < _header.size + _digestSize:
+            raise ValueError('Truncated codebook')
+        magic, version, bigEndian, count, stateSize = \
+            _header.unpack_from(view)
+        if magic != _magic:
+            raise ValueError('Not a codebook file')
+        if version != _version:
+            raise ValueError('Unsupported codebook version ' + str(version))
+        if bigEndian != (sys.byteorder == 'big'):
+            raise ValueError('Codebook was compiled for another byte order')
+
+        start = _header.size + _digestSize
+        expected = start + _pad(stateSize) + count * _sectionSize
+        if len(view) != expected:
+            raise ValueError('Truncated codebook')
+
+        self.digest = bytes(view[_header.size:start])
+        if verify and hashlib.blake2s(view[start:]).digest() != self.digest:
+            raise ValueError('Codebook does not match its digest')
+
+        self.state = bytes(view[start:start + stateSize])
+
+        # Wrap the mapped tables of each section
+        self.tables = []
+        offset = start + _pad(stateSize)
+        for i in range(count):
+            notchCount, = _sectionHeader.unpack_from(view, offset)
+            offset += _sectionHeader.size
+
+            fields = {}
+            for name, size in _sectionFields:
+                fields[name] = view[offset:offset + size]
+                offset += size
+
+            wiring = bytes(fields['wiring'])
+            notchSet = bytes(fields['notchSet'][:notchCount])
+            tables = rotors.Tables.fromBuffers(
+                wiring,
+                fields['wiring_forward'],
+                fields['wiring_reverse'],
+                fields['notches'],
+                fields['notch_counts'][:514],
+                fields['pinBlock']
+            )
+            rotors._tableCache[(wiring, notchSet)] = tables
+            self.tables.append(tables)
+
+    def machine(self, **kwargs):
+        """Build a machine from the codebook, at its compiled settings."""
+        return bitmachine.Machine(state=self.state, **kwargs)
@@ -0,0 +1,127 @@
+# stdlib imports
+import bz2
+import io
+import lzma
+import zlib
+
+# third party imports
+
+# local module imports
+
+
+# Header written ahead of the compressed data; the magic and a codec id
+_magic = b'BNZ'
+_headerSize = len(_magic) + 1
+
+# Supported codecs, by name and by header id
+codecs = ('zlib', 'lzma', 'bz2')
+_codecIds = {'zlib': 1, 'lzma': 2, 'bz2': 3}
+
+
+def _compressor(codec, level):
+    """Create a streaming compressor for a codec"""
+    if codec == 'zlib':
+        return zlib.compressobj(6 if level is None else level)
+    elif codec == 'lzma':
+        return lzma.LZMACompressor(preset=level)
+    elif codec == 'bz2':
+        return bz2.BZ2Compressor(9 if level is None else level)
+    raise ValueError(str(codec) + ' is not a valid codec name')
+
+
+def _decompressor(codecId):
+    """Create a streaming decompressor for a codec header id"""
+    if codecId == _codecIds['zlib']:
+        return zlib.decompressobj()
+    elif codecId == _codecIds['lzma']:
+        return lzma.LZMADecompressor()
+    elif codecId == _codecIds['bz2']:
+        return bz2.BZ2Decompressor()
+    raise ValueError('Unknown codec id ' + str(codecId))
+
+
+class CompressReader(io.RawIOBase):
+    """
+    Readable stream of the header and compressed contents of another stream.
+
+    The source is read and compressed `chunkSize` bytes at a time, as the
+    reader is read from.
+    """
+
+    def __init__(self, stream, codec='zlib', level=None, chunkSize=64 * 1024):
+        super().__init__()
+        self._stream = stream
+        self._compressor = _compressor(codec, level)
+        self._chunkSize = chunkSize
+        self._pending = bytearray(_magic + bytes([_codecIds[codec]]))
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        with memoryview(buffer) as view:
+            # Compress until there is enough to fill the buffer
+            while len(self._pending) < len(view) and not self._eof:
+                data = self._stream.read(self._chunkSize)
+                if data:
+                    self._pending += self._compressor.compress(data)
+                else:
+                    self._pending += self._compressor.flush()
+                    self._eof = True
+
+            count = min(len(view), len(self._pending))
+            view[:count] = self._pending[:count]
+        del self._pending[:count]
+        return count
+
+
+class DecompressWriter(io.RawIOBase):
+    """
+    Writable stream that decompresses everything written to it, codec header
+    first, into another stream.
+
+    Closing the writer checks that the compressed data was complete; the
+    other stream is left open.
+    """
+
+    def __init__(self, stream):
+        super().__init__()
+        self._stream = stream
+        self._header = bytearray()
+        self._decompressor = None
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        count = len(data)
+
+        # Read the codec from the header first
+        if self._decompressor is None:
+            need = _headerSize - len(self._header)
+            self._header += data[:need]
+            data = data[need:]
+            if len(self._header) < _headerSize:
+                return count
+            if self._header[:len(_magic)] != _magic:
+                raise ValueError('Not a compressed stream')
+            self._decompressor = _decompressor(self._header[-1])
+
+        if self._decompressor.eof:
+            if len(data):
+                raise ValueError('Data after the end of the compressed stream')
+            return count
+
+        self._stream.write(self._decompressor.decompress(data))
+        if self._decompressor.eof and self._decompressor.unused_data:
+            raise ValueError('Data after the end of the compressed stream')
+        return count
+
+    def close(self):
+        if self.closed:
+            return
+        complete = self._decompressor is not None and self._decompressor.eof
+        super().close()
+        if not complete:
+            raise ValueError('Truncated compressed stream')
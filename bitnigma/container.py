@@ -0,0 +1,404 @@
+# stdlib imports
+import collections
+import hashlib
+import io
+import struct
+
+# third party imports
+
+# local module imports
+import bitnigma.machine as bitmachine
+import bitnigma.parallel as parallel
+
+
+# File header; magic, version, rotor count, block size, state digest
+_header = struct.Struct('<4sHHI32s')
+_magic = b'BNCT'
+_version = 1
+
+# Index entry of each block; file offset, keystream position, length, and
+# checksum, followed by the rotor settings at the start of the block
+_entry = struct.Struct('<QQI16s')
+
+# File trailer; index offset, block count, index checksum, magic
+_trailer = struct.Struct('<QQ16s4s')
+_trailerMagic = b'BNCI'
+
+# Size of the windows of blocks handed to a worker pool
+_windowSize = 16 * 1024 ** 2
+
+# A block of a container, as recorded in its index
+Block = collections.namedtuple(
+    'Block',
+    ['offset', 'position', 'length', 'checksum', 'settings']
+)
+
+
+def _checksum(data):
+    """Checksum of the stored (translated) bytes of a block"""
+    return hashlib.blake2s(data, digest_size=16).digest()
+
+
+def stateDigest(state):
+    """Digest of a machine state, as recorded in `gencert` certificates."""
+    return hashlib.blake2s(state).digest()
+
+
+def _readFull(stream, view):
+    """Fill a memoryview from a stream, short only at the end of the stream"""
+    done = 0
+    while done < len(view):
+        count = stream.readinto(view[done:])
+        if not count:
+            break
+        done += count
+    return done
+
+
+def _windowBlocks(blockSize):
+    """Number of blocks in each window handed to a worker pool"""
+    return max(_windowSize // blockSize, 1)
+
+
+class Writer:
+    """
+    Translates data into a container of fixed-size blocks.
+
+    The container starts with a header holding the block size and the
+    digest of the machine's state, followed by the translated blocks, and
+    ends with an index of every block's offset, keystream position, rotor
+    settings and checksum. The machine is advanced past everything written.
+    """
+
+    def __init__(self, stream, machine, blockSize=1024 ** 2,
+                 engine='composite'):
+        self._stream = stream
+        self._machine = machine
+        self._engine = engine
+        self.blockSize = blockSize
+        self.blocks = []
+
+        # Partially filled block
+        self._buffer = bytearray(blockSize)
+        self._filled = 0
+
+        stream.write(_header.pack(
+            _magic,
+            _version,
+            len(machine.rotors),
+            blockSize,
+            stateDigest(machine.stateGet())
+        ))
+        self._offset = _header.size
+        self._position = 0
+
+    def _append(self, data, settings):
+        """Write out one translated block and record it in the index"""
+        self._stream.write(data)
+        self.blocks.append(Block(
+            self._offset,
+            self._position,
+            len(data),
+            _checksum(data),
+            settings
+        ))
+        self._offset += len(data)
+        self._position += len(data)
+
+    def _flush(self):
+        """Translate and write out the buffered block"""
+        settings = self._machine.snapshot()
+        with memoryview(self._buffer)[:self._filled] as block:
+            self._machine.translateInto(block, block, self._engine)
+            self._append(block, settings)
+        self._filled = 0
+
+    def write(self, data):
+        """Add data to the container, writing out every block it completes."""
+        with memoryview(data).cast('B') as view:
+            done = 0
+            while done < len(view):
+                count = min(len(view) - done, self.blockSize - self._filled)
+                self._buffer[self._filled:self._filled + count] = \
+                    view[done:done + count]
+                self._filled += count
+                done += count
+                if self._filled == self.blockSize:
+                    self._flush()
+        return len(data)
+
+    def writePool(self, stream, pool):
+        """
+        Add the rest of a stream to the container, translated by a worker
+        pool that was created at the machine's current settings. The pool's
+        window size must be a multiple of the block size.
+        """
+        if self._filled:
+            raise ValueError('Cannot mix pool writes into a partial block')
+        base = self._machine.snapshot()
+        start = self._position
+
+        while True:
+            with pool.input[:pool.windowSize] as window:
+                length = _readFull(stream, window)
+            if not length:
+                break
+
+            pool.translateWindow(length, self._position - start)
+
+            # The settings at each block are worked out arithmetically
+            with pool.output[:length] as window:
+                for i in range(0, length, self.blockSize):
+                    self._machine.restore(base)
+                    self._machine.advance(self._position - start)
+                    self._append(
+                        window[i:i + self.blockSize],
+                        self._machine.snapshot()
+                    )
+
+            if length < pool.windowSize:
+                break
+
+        # Leave the machine past everything written
+        self._machine.restore(base)
+        self._machine.advance(self._position - start)
+
+    def close(self):
+        """Write out the last block, then the index and trailer."""
+        if self._filled:
+            self._flush()
+
+        index = io.BytesIO()
+        for block in self.blocks:
+            index.write(_entry.pack(*block[:4]))
+            index.write(bytes(block.settings))
+        index = index.getvalue()
+
+        self._stream.write(index)
+        self._stream.write(_trailer.pack(
+            self._offset,
+            len(self.blocks),
+            _checksum(index),
+            _trailerMagic
+        ))
+
+
+def encode(machine, stream_in, stream_out, blockSize=1024 ** 2, jobs=1,
+           engine='composite'):
+    """
+    Translate a stream into a container, using `jobs` worker processes.
+    Returns the list of written Blocks.
+    """
+    writer = Writer(stream_out, machine, blockSize, engine)
+
+    if jobs > 1:
+        with parallel.WorkerPool(
+                machine,
+                jobs,
+                windowSize=blockSize * _windowBlocks(blockSize),
+                chunkSize=blockSize,
+                engine=engine
+                ) as pool:
+            writer.writePool(stream_in, pool)
+
+    else:
+        buffer = bytearray(blockSize)
+        with memoryview(buffer) as view:
+            while True:
+                length = _readFull(stream_in, view)
+                if not length:
+                    break
+                with view[:length] as chunk:
+                    writer.write(chunk)
+
+    writer.close()
+    return writer.blocks
+
+
+class Reader:
+    """
+    Reads the index of a container, to verify or decode any of its blocks.
+
+    A state is only needed to decode; it must be the state the container was
+    written from, which is checked against the digest in the header.
+    """
+
+    def __init__(self, stream, state=None):
+        """
+        Open a container.
+
+        Arguments;
+        -   stream: seekable binary file object over the container
+        -   state: the `Machine.stateGet()` blob (or a Machine) that the
+            container was written with
+        """
+        self._stream = stream
+
+        # Check the header
+        stream.seek(0)
+        header = stream.read(_header.size)
+        if len(header) < _header.size:
+            raise ValueError('Truncated container')
+        magic, version, rotorCount, self.blockSize, self.digest = \
+            _header.unpack(header)
+        if magic != _magic:
+            raise ValueError('Not a container file')
+        if version != _version:
+            raise ValueError('Unsupported container version ' + str(version))
+
+        # Find the index through the trailer
+        end = stream.seek(0, io.SEEK_END)
+        if end < _header.size + _trailer.size:
+            raise ValueError('Truncated container')
+        stream.seek(end - _trailer.size)
+        indexOffset, count, indexChecksum, magic = _trailer.unpack(
+            stream.read(_trailer.size)
+        )
+        entrySize = _entry.size + rotorCount
+        if magic != _trailerMagic or \
+                indexOffset + count * entrySize + _trailer.size != end:
+            raise ValueError('Container index is missing or truncated')
+
+        stream.seek(indexOffset)
+        index = stream.read(count * entrySize)
+        if _checksum(index) != indexChecksum:
+            raise ValueError('Container index is corrupted')
+
+        self.blocks = []
+        for i in range(count):
+            start = i * entrySize
+            fields = _entry.unpack_from(index, start)
+            settings = tuple(index[start + _entry.size:start + entrySize])
+            self.blocks.append(Block(*fields, settings))
+
+        # A private machine, checked against the header
+        self._machine = None
+        if state is not None:
+            if isinstance(state, bitmachine.Machine):
+                state = state.stateGet()
+            if stateDigest(state) != self.digest:
+                raise ValueError('Container was written with another state')
+            self._machine = bitmachine.Machine(state=state)
+
+    def _read(self, block):
+        """Read the stored bytes of a block"""
+        self._stream.seek(block.offset)
+        return self._stream.read(block.length)
+
+    def verify(self, indices=None):
+        """
+        Check the stored bytes of the blocks at `indices` (or every block)
+        against their checksums. Returns the indices of corrupted blocks.
+        """
+        if indices is None:
+            indices = range(len(self.blocks))
+        return [
+            i for i in indices
+            if _checksum(self._read(self.blocks[i])) !=
+            self.blocks[i].checksum
+        ]
+
+    def _requireMachine(self):
+        if self._machine is None:
+            raise ValueError('A state is needed to decode a container')
+
+    def readBlocks(self, indices, strict=True, engine='composite'):
+        """
+        Decode the blocks at `indices`. A corrupted block raises a ValueError,
+        or with `strict` off, is returned as None.
+        """
+        self._requireMachine()
+
+        stored = []
+        settings = []
+        for i in indices:
+            block = self.blocks[i]
+            data = self._read(block)
+            if _checksum(data) != block.checksum:
+                if strict:
+                    raise ValueError('Block {0} is corrupted'.format(i))
+                data = None
+            stored.append(data)
+            settings.append(block.settings)
+
+        # Decode the intact blocks as one batch
+        intact = [i for i, data in enumerate(stored) if data is not None]
+        decoded = self._machine.translateMany(
+            [stored[i] for i in intact],
+            [settings[i] for i in intact],
+            engine
+        )
+        for i, data in zip(intact, decoded):
+            stored[i] = data
+        return stored
+
+    def decode(self, stream_out, jobs=1, strict=True, engine='composite'):
+        """
+        Decode every block into a stream, using `jobs` worker processes.
+
+        A corrupted block raises a ValueError, or with `strict` off, is
+        written as zeros so the blocks after it stay in place. Returns the
+        indices of corrupted blocks.
+        """
+        self._requireMachine()
+        corrupted = []
+
+        perWindow = _windowBlocks(self.blockSize)
+
+        if jobs <= 1:
+            for first in range(0, len(self.blocks), perWindow):
+                indices = range(first, min(first + perWindow,
+                                           len(self.blocks)))
+                for i, data in zip(indices, self.readBlocks(
+                        indices, strict, engine)):
+                    if data is None:
+                        corrupted.append(i)
+                        data = bytes(self.blocks[i].length)
+                    stream_out.write(data)
+            return corrupted
+
+        if not self.blocks:
+            return corrupted
+
+        # Workers start from the settings at the first block
+        self._machine.restore(self.blocks[0].settings)
+
+        with parallel.WorkerPool(
+                self._machine,
+                jobs,
+                windowSize=self.blockSize * perWindow,
+                chunkSize=self.blockSize,
+                engine=engine
+                ) as pool:
+            for first in range(0, len(self.blocks), perWindow):
+                blocks = self.blocks[first:first + perWindow]
+                length = sum(block.length for block in blocks)
+
+                # Windows of blocks are contiguous in the file
+                self._stream.seek(blocks[0].offset)
+                with pool.input[:length] as window:
+                    if _readFull(self._stream, window) != length:
+                        raise ValueError('Truncated container')
+
+                    # Check every block before decoding the window
+                    bad = []
+                    start = 0
+                    for i, block in enumerate(blocks, first):
+                        stop = start + block.length
+                        if _checksum(window[start:stop]) != block.checksum:
+                            if strict:
+                                raise ValueError(
+                                    'Block {0} is corrupted'.format(i)
+                                )
+                            bad.append((start, stop))
+                            corrupted.append(i)
+                        start = stop
+
+                pool.translateWindow(length, blocks[0].position)
+
+                with pool.output[:length] as window:
+                    for start, stop in bad:
+                        window[start:stop] = bytes(stop - start)
+                    stream_out.write(window)
+
+        return corrupted
@@ -0,0 +1,262 @@
+# stdlib imports
+import hashlib
+import json
+import os
+import shutil
+
+# third party imports
+
+# local module imports
+import bitnigma.container as container
+import bitnigma.machine as bitmachine
+import bitnigma.parallel as parallel
+
+
+# Version of the manifest document
+_manifestVersion = 1
+
+
+def startOffset(state, path):
+    """
+    Derive the keystream offset a file starts at; the first 8 bytes of the
+    blake2s hash of its relative POSIX path, keyed with the digest of the
+    state, as a big endian integer.
+    """
+    digest = hashlib.blake2s(
+        path.encode('utf-8'),
+        key=container.stateDigest(state),
+        person=b'bndir1',
+        digest_size=8
+    ).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _join(root, path):
+    """
+    Join a relative POSIX path of a tree onto a root, refusing any path that
+    could lead outside of it.
+    """
+    parts = path.split('/')
+    if not path or path.startswith('/') or any(
+            part in ('', '.', '..') or os.sep in part or
+            (os.altsep and os.altsep in part) or os.path.isabs(part) or
+            os.path.splitdrive(part)[0]
+            for part in parts
+            ):
+        raise ValueError('Unsafe path in tree: ' + repr(path))
+    return os.path.join(root, *parts)
+
+
+def walk(root):
+    """List the relative POSIX paths of the regular files under a root."""
+    paths = []
+    for directory, directories, files in os.walk(root):
+        directories.sort()
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                relative = os.path.relpath(path, root).replace(os.sep, '/')
+                _join(root, relative)
+                paths.append(relative)
+    return paths
+
+
+def _setup(state, bufferSize, kwargs):
+    """Build the machine and buffer a process translates files with."""
+    machine = bitmachine.Machine(state=state)
+    return {
+        'machine': machine,
+        'base': machine.snapshot(),
+        'buffer': bytearray(bufferSize),
+        'kwargs': kwargs
+    }
+
+
+def _translateTask(worker, task):
+    """
+    Translate one file from keystream `offset`. Returns its path, size, and
+    the digests of what was read and what was written.
+    """
+    path, path_in, path_out, offset = task
+    machine = worker['machine']
+    machine.restore(worker['base'])
+    machine.advance(offset)
+
+    digest_in = hashlib.blake2s()
+    digest_out = hashlib.blake2s()
+    size = 0
+
+    os.makedirs(os.path.dirname(path_out) or '.', exist_ok=True)
+    with open(path_in, 'rb') as stream_in, \
+            open(path_out, 'wb') as stream_out, \
+            memoryview(worker['buffer']) as buffer:
+        while True:
+            length = stream_in.readinto(buffer)
+            if not length:
+                break
+            with buffer[:length] as chunk:
+                digest_in.update(chunk)
+                machine.translateInto(chunk, chunk, **worker['kwargs'])
+                digest_out.update(chunk)
+                stream_out.write(chunk)
+            size += length
+    shutil.copymode(path_in, path_out)
+
+    return path, size, digest_in.hexdigest(), digest_out.hexdigest()
+
+
+def _checkTasks(root_in, root_out, tasks):
+    """Refuse to translate any file onto itself, which would empty it"""
+    if os.path.exists(root_out) and os.path.samefile(root_in, root_out):
+        raise ValueError('Input and output roots must be different')
+    for path, path_in, path_out, offset in tasks:
+        if os.path.exists(path_out) and os.path.samefile(path_in, path_out):
+            raise ValueError('Input and output are the same file: ' + path)
+
+
+def _run(state, tasks, jobs, bufferSize, progressCallback, kwargs):
+    """Run translation tasks, in a process pool if `jobs` is over 1"""
+    total = len(tasks)
+    if progressCallback:
+        progressCallback(0, total)
+
+    batch = max(total // ((jobs or os.cpu_count() or 1) * 16), 1)
+    results = parallel.mapTasks(
+        _translateTask,
+        tasks,
+        _setup,
+        (state, bufferSize, kwargs),
+        jobs=jobs,
+        batchSize=min(batch, 64)
+    )
+
+    try:
+        done = []
+        for result in results:
+            done.append(result)
+            if progressCallback:
+                progressCallback(len(done), total)
+        return done
+    finally:
+        results.close()
+
+
+def translateTree(
+        state,
+        root_in,
+        root_out,
+        jobs=None,
+        bufferSize=1024 ** 2,
+        progressCallback=None,
+        **kwargs
+        ):
+    """
+    Translate every file under `root_in` into the same path under
+    `root_out`, using a pool of `jobs` worker processes.
+
+    Each file starts at its own keystream offset from the state (see
+    `startOffset`), so any file can later be translated back on its own.
+    Returns the manifest; the state digest, and the path, size, start
+    offset and input digest of every file. Translating a tree, or any file
+    of it, onto itself raises a ValueError.
+    """
+    if isinstance(state, bitmachine.Machine):
+        state = state.stateGet()
+
+    tasks = [
+        (
+            path,
+            _join(root_in, path),
+            _join(root_out, path),
+            startOffset(state, path)
+        )
+        for path in walk(root_in)
+    ]
+    _checkTasks(root_in, root_out, tasks)
+
+    results = _run(state, tasks, jobs, bufferSize, progressCallback, kwargs)
+
+    return {
+        'version': _manifestVersion,
+        'state_digest': container.stateDigest(state).hex(),
+        'files': [
+            {
+                'path': path,
+                'size': size,
+                'offset': task[3],
+                'digest': digest_in
+            }
+            for task, (path, size, digest_in, _) in zip(tasks, results)
+        ]
+    }
+
+
+def translateManifest(
+        state,
+        manifest,
+        root_in,
+        root_out,
+        paths=None,
+        jobs=None,
+        bufferSize=1024 ** 2,
+        progressCallback=None,
+        **kwargs
+        ):
+    """
+    Translate files listed in a manifest back from `root_in` into
+    `root_out`; every file, or only those in `paths`.
+
+    Each output is checked against the digest in the manifest. Returns the
+    paths of the files that did not match. Manifest paths that are absolute
+    or climb out of the roots, and files that would be translated onto
+    themselves, raise a ValueError.
+    """
+    if isinstance(state, bitmachine.Machine):
+        state = state.stateGet()
+    if manifest['state_digest'] != container.stateDigest(state).hex():
+        raise ValueError('Manifest was written with another state')
+
+    entries = manifest['files']
+    if paths is not None:
+        wanted = set(paths)
+        entries = [entry for entry in entries if entry['path'] in wanted]
+        missing = wanted - {entry['path'] for entry in entries}
+        if missing:
+            raise ValueError('Not in the manifest: ' + ', '.join(
+                sorted(missing)
+            ))
+
+    tasks = [
+        (
+            entry['path'],
+            _join(root_in, entry['path']),
+            _join(root_out, entry['path']),
+            entry['offset']
+        )
+        for entry in entries
+    ]
+    _checkTasks(root_in, root_out, tasks)
+
+    results = _run(state, tasks, jobs, bufferSize, progressCallback, kwargs)
+
+    return [
+        path
+        for entry, (path, size, _, digest_out) in zip(entries, results)
+        if size != entry['size'] or digest_out != entry['digest']
+    ]
+
+
+def writeManifest(manifest, path):
+    """Save a manifest as JSON."""
+    with open(path, 'w') as file:
+        json.dump(manifest, file, indent=1)
+        file.write('\n')
+
+
+def readManifest(path):
+    """Load a manifest saved by `writeManifest`."""
+    with open(path, 'r') as file:
+        manifest = json.load(file)
+    if manifest.get('version') != _manifestVersion:
+        raise ValueError('Unsupported manifest version')
+    return manifest
@@ -0,0 +1,117 @@
+# stdlib imports
+import contextlib
+import io
+import os
+import tempfile
+
+# third party imports
+
+# local module imports
+import bitnigma.machine as bitmachine
+
+
+@contextlib.contextmanager
+def atomicWrite(path, mode='wb'):
+    """
+    Open a temporary file beside `path` to write, and swap it into place
+    once the block completes. On an error the temporary file is removed, and
+    `path` is left as it was.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(descriptor, mode) as file:
+            yield file
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+class EnigmaFile(io.RawIOBase):
+    """
+    Seekable, read-only file object over an encrypted file.
+
+    Only the bytes asked for by a read are decrypted. Seeking places a
+    private machine at the requested offset of the keystream, counted from
+    the state the file was encrypted with.
+    """
+
+    def __init__(self, path, state):
+        """
+        Open an encrypted file.
+
+        Arguments;
+        -   path: file path, or a seekable binary file object
+        -   state: the `Machine.stateGet()` blob (or a Machine) that the
+            file was encrypted with, from its first byte
+        """
+        super().__init__()
+
+        if isinstance(state, bitmachine.Machine):
+            state = state.stateGet()
+        self._machine = bitmachine.Machine(state=state)
+
+        # Only close the underlying file if we opened it
+        self._owned = not hasattr(path, 'readinto')
+        self._raw = open(path, 'rb') if self._owned else path
+
+        # Offset of the next read, and the offset the machine is at
+        self._position = 0
+        self._machinePosition = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        """Move to a new offset; the keystream is only repositioned on read."""
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._raw.seek(0, io.SEEK_END) + offset
+        else:
+            raise ValueError('Invalid whence value: ' + str(whence))
+
+        if position < 0:
+            raise ValueError('Negative seek position ' + str(position))
+
+        self._position = position
+        return position
+
+    def readinto(self, buffer):
+        """Read and decrypt up to len(buffer) bytes into the buffer."""
+        self._raw.seek(self._position)
+
+        with memoryview(buffer) as view:
+            count = self._raw.readinto(view) or 0
+            if not count:
+                return 0
+
+            # Only reposition the machine after a seek
+            if self._machinePosition != self._position:
+                self._machine.seek(self._position)
+
+            with view[:count] as chunk:
+                self._machine.translateInto(chunk, chunk)
+
+        self._position += count
+        self._machinePosition = self._position
+        return count
+
+    def close(self):
+        if not self.closed and self._owned:
+            self._raw.close()
+        super().close()
+
+
+def openFile(path, state, bufferSize=io.DEFAULT_BUFFER_SIZE):
+    """Open an encrypted file as a buffered, seekable, decrypting reader."""
+    return io.BufferedReader(EnigmaFile(path, state), bufferSize)
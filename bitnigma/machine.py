@@ -1,34 +1,70 @@
 # stdlib imports
 import array
+import asyncio
+import collections
+import functools
+import hashlib
 import io
-import random
+import mmap
+import os
+import queue
+import threading
 import time
 
 # third party imports
 
 # local module imports
+import bitnigma.backends as backends
+import bitnigma.compression as compression
+import bitnigma.metrics as metrics
 import bitnigma.rotors as rotors
 import bitnigma.reflectors as reflectors
 
 
+# Hit and miss counters of the composite table cache
+CacheInfo = collections.namedtuple(
+    'CacheInfo',
+    ['hits', 'misses', 'maxsize', 'currsize']
+)
+
+
 class Machine:
+    # Names of the built in translation engines, and 'auto' to pick the
+    # fastest for the machine and chunk size (see `backends.select`)
+    engines = ('composite', 'reference', 'numpy', 'flat', 'auto')
+
     def __init__(
             self,
             plugboardStack=[],
             rotorStack=[],
             reflector=None,
-            state=None
+            state=None,
+            compositeCacheSize=256
             ):
         """Initialize a new Enigma Machine.
 
         Keyword arguments;
         -   plugboardStack
+        -   compositeCacheSize: the number of inner rotor stack permutations
+            kept in the composite table cache
         """
         # Initialize the empty variables
         self.plugboard = []
         self.rotors = []
         self.reflector = None
 
+        # Initialize the composite table cache
+        self._composites = collections.OrderedDict()
+        self._compositeCacheSize = compositeCacheSize
+        self._compositeHits = 0
+        self._compositeMisses = 0
+
+        # Flat arrays of the stack, built when the flat engine first runs
+        self._flat = None
+
+        # Runtime metrics are off until enabled
+        self.metrics = None
+
         # Unpack the state
         if state:
             self.stateSet(state)
@@ -45,6 +81,13 @@ class Machine:
         # go ahead and set a break point
         self.breakSet()
 
+    def __reduce__(self):
+        '''Pickle the machine as its serialized state, not its object graph'''
+        return (
+            Machine,
+            ([], [], None, self.stateGet(), self._compositeCacheSize)
+        )
+
     def _initPlugboard(self, stack):
         '''Initialize the plugboard translation matrix'''
         # Start with an untampered matrix
@@ -120,6 +163,63 @@ class Machine:
         self.rotors[-1].next = self.reflector
         self.reflector.previous = self.rotors[-1]
 
+        # Tables of the old components are no longer valid
+        self._composites.clear()
+        self._flat = None
+
+    def _compileComposite(self):
+        """
+        Compile the permutation of pins leaving the first rotor that pass
+        through the inner rotors, the reflector, and back again.
+        """
+        # Start from the reflector
+        composite = self.reflector.pinTables(0)[0]
+
+        # Wrap each inner rotor around it, working back from the reflector
+        for rotor in self.rotors[:0:-1]:
+            forward, reverse = rotor.pinTables(rotor.setting)
+            composite = forward.translate(composite).translate(reverse)
+
+        return composite
+
+    def _composite(self):
+        """Get the composite table for the current inner rotor settings."""
+        key = tuple(r.setting for r in self.rotors[1:])
+
+        # Look in the cache first
+        composite = self._composites.get(key)
+        if composite is not None:
+            self._compositeHits += 1
+            self._composites.move_to_end(key)
+            return composite
+
+        # Compile and store it, evicting the least recently used table
+        self._compositeMisses += 1
+        composite = self._compileComposite()
+        self._composites[key] = composite
+        if len(self._composites) > self._compositeCacheSize:
+            self._composites.popitem(last=False)
+        return composite
+
+    def enableMetrics(self):
+        '''Start collecting runtime metrics, and return the Metrics object'''
+        if self.metrics is None:
+            self.metrics = metrics.Metrics()
+        return self.metrics
+
+    def disableMetrics(self):
+        '''Stop collecting runtime metrics'''
+        self.metrics = None
+
+    def compositeCacheInfo(self):
+        """Report the hits, misses, and size of the composite table cache."""
+        return CacheInfo(
+            self._compositeHits,
+            self._compositeMisses,
+            self._compositeCacheSize,
+            len(self._composites)
+        )
+
     def stateGet(self):
         """Get a serialized state of the machine.
 
@@ -159,13 +259,19 @@ class Machine:
         return state.read()
 
     def stateSet(self, state):
-        """Set the state of the machine from a serialized input"""
+        """
+        Set the state of the machine from a serialized input. The break
+        state is moved to the new state, as the old settings may not fit it.
+        """
         # First, let's read it into a buffer
         state = io.BytesIO(state)
 
         # Unpack the plugboard
         self.plugboard = array.array('B', state.read(256))
 
+        # Discard any existing rotors
+        self.rotors = []
+
         # Get the number of rotors
         rotor_count = state.read(1)[0]
 
@@ -191,14 +297,42 @@ class Machine:
         # Last but not least, we must link the components
         self._link()
 
+        # Settings saved for the old rotors would not match the new ones
+        self.breakSet()
+
+    def snapshot(self):
+        '''Capture the mutable state of the machine: its rotor settings'''
+        return tuple(r.setting for r in self.rotors)
+
+    def restore(self, snapshot):
+        '''Return the rotors to the settings captured by `snapshot`'''
+        if len(snapshot) != len(self.rotors):
+            raise ValueError('Snapshot does not match the number of rotors')
+        for rotor, setting in zip(self.rotors, snapshot):
+            rotor.setting = setting
+
     def breakSet(self):
-        '''Save the current state to be easily returned to later'''
-        self._breakstate = self.stateGet()
+        '''Save the current rotor settings to be easily returned to later'''
+        self._breakstate = self.snapshot()
 
     def breakGo(self):
         '''Return to the saved break state'''
         assert hasattr(self, '_breakstate')
-        self.stateSet(self._breakstate)
+        self.restore(self._breakstate)
+
+    def advance(self, steps):
+        '''Move the machine forward by `steps` bytes without translating'''
+        if steps < 0:
+            raise ValueError('The machine can not be advanced backwards')
+        self.rotors[0].advance(steps)
+
+    def seek(self, offset):
+        '''
+        Position the machine at a byte offset of the keystream, counted
+        from the saved break state.
+        '''
+        self.breakGo()
+        self.advance(offset)
 
     def translatePin(self, pin):
         """
@@ -223,38 +357,224 @@ class Machine:
         # Return the fruits of our labor
         return pin
 
-    def translateChunk(self, chunk_in):
+    def _translateReference(self, chunk_in, chunk_out):
+        """Translate a chunk by sending every byte through `translatePin`."""
+        for i, byte_in in enumerate(chunk_in):
+            chunk_out[i] = self.translatePin(byte_in)
+
+    def _translateComposite(self, chunk_in, chunk_out):
+        """
+        Translate a chunk through the first rotor and the cached composite
+        table of the rest of the machine.
+        """
+        # Pull everything needed out of the first rotor
+        rotor = self.rotors[0]
+        forward = rotor.wiring_forward
+        reverse = rotor.wiring_reverse
+        notches = rotor.notches
+        setting = rotor.setting
+        plugboard = self.plugboard
+        composite = self._composite()
+
+        for i, byte_in in enumerate(chunk_in):
+            pin = plugboard[byte_in]
+            pin = (pin + forward[(pin + setting) % 256]) % 256
+            pin = composite[pin]
+            pin = (pin + reverse[(pin + setting) % 256]) % 256
+            chunk_out[i] = plugboard[pin]
+
+            # Step the first rotor, and on a notch, the rest of the stack
+            setting = (setting + 1) % 256
+            if notches[setting]:
+                rotor.next.step()
+                composite = self._composite()
+
+        # Store the final setting of the first rotor
+        rotor.setting = setting
+
+    def _flatTables(self):
+        '''
+        Get the rotor stack as plain lists; the forward and reverse wiring
+        offsets of each rotor, repeated twice so a pin plus a setting needs
+        no wrapping, the notch flags of rotor i at [i * 256:(i + 1) * 256]
+        of one array, and the reflector's pin table.
+        '''
+        if self._flat is None:
+            self._flat = (
+                [list(rotor.wiring_forward) * 2 for rotor in self.rotors],
+                [list(rotor.wiring_reverse) * 2 for rotor in self.rotors],
+                b''.join(bytes(rotor.notches) for rotor in self.rotors),
+                self.reflector.pinTables(0)[0]
+            )
+        return self._flat
+
+    def _translateFlat(self, chunk_in, chunk_out):
+        """
+        Translate a chunk with tight loops over flat tables of the stack,
+        with no per-rotor method calls or recursion.
+        """
+        forward, reverse, notches, reflector = self._flatTables()
+        reverse = reverse[::-1]
+        plugboard = self.plugboard
+        settings = [rotor.setting for rotor in self.rotors]
+        count = len(settings)
+
+        for i, byte_in in enumerate(chunk_in):
+            pin = plugboard[byte_in]
+
+            # Forward through the rotors, off the reflector, and back
+            for offsets, setting in zip(forward, settings):
+                pin = (pin + offsets[pin + setting]) & 255
+            pin = reflector[pin]
+            for offsets, setting in zip(reverse, reversed(settings)):
+                pin = (pin + offsets[pin + setting]) & 255
+
+            chunk_out[i] = plugboard[pin]
+
+            # Step the stack like an odometer
+            j = 0
+            while j < count:
+                setting = (settings[j] + 1) & 255
+                settings[j] = setting
+                if not notches[(j << 8) + setting]:
+                    break
+                j += 1
+
+        # Store the final settings
+        for rotor, setting in zip(self.rotors, settings):
+            rotor.setting = setting
+
+    def _translateInto(self, chunk_in, chunk_out, engine='composite'):
+        """
+        Translate a chunk into a writable buffer of at least the same length.
+        Both may be the same buffer, for translating in place.
+        """
+        if engine == 'auto':
+            engine = backends.select(self, len(chunk_in))
+        backend = backends.get(engine)
+
+        # Count the chunk while the rotors are still at its start
+        if self.metrics is not None:
+            self.metrics.recordChunk(self.rotors, len(chunk_in))
+
+        backend.translate(self, chunk_in, chunk_out)
+
+    def translateInto(self, chunk_in, chunk_out, engine='composite'):
+        """
+        Translate any bytes-like object into a writable buffer of at least
+        the same length, such as a bytearray, memoryview, or mmap. Both may
+        be the same buffer. Returns the number of bytes translated.
+        """
+        view_in = memoryview(chunk_in).cast('B')
+        view_out = memoryview(chunk_out).cast('B')
+        count = len(view_in)
+
+        try:
+            if view_out.readonly:
+                raise TypeError('The output buffer must be writable')
+            if len(view_out) < count:
+                raise ValueError('The output buffer is too small')
+            self._translateInto(view_in, view_out, engine)
+
+        finally:
+            view_in.release()
+            view_out.release()
+
+        return count
+
+    def translateChunk(self, chunk_in, engine='composite'):
         """
         Translate a non-empty bytes or bytearray object through the machine.
+
+        The `engine` argument selects how the chunk is processed;
+        -   'composite' uses cached tables of the inner rotor stack
+        -   'reference' sends every byte through `translatePin`
+        -   'numpy' translates the whole chunk at once (requires NumPy)
+        -   'flat' loops over flat arrays of the rotor stack, for deep stacks
+        -   'auto' picks the fastest of these for the machine and chunk size
+        -   any other backend registered with `backends.register`
         """
         # Initialize the outgoing chunk
-        chunk_out = array.array('B')
+        chunk_out = array.array('B', bytes(len(chunk_in)))
 
-        # For bytes, this is super easy
-        for byte_in in chunk_in:
-            chunk_out.append(self.translatePin(byte_in))
+        # Translate into it
+        self._translateInto(chunk_in, chunk_out, engine)
 
         # Return the processed chunk
         return chunk_out
 
+    def translateMany(self, messages, start_settings=None, engine='composite'):
+        """
+        Translate a batch of independent messages in one call.
+
+        Each entry of `start_settings` gives where its message starts;
+        either a rotor settings tuple (as returned by `snapshot`), or an
+        integer keystream offset counted from the machine's current
+        settings. Without it, every message starts from the current
+        settings. Rotor tables and composite tables are shared by the whole
+        batch, and the machine is left where it was.
+
+        Returns a list of translated bytearrays.
+        """
+        messages = list(messages)
+        if start_settings is None:
+            start_settings = [0] * len(messages)
+        start_settings = list(start_settings)
+        if len(start_settings) != len(messages):
+            raise ValueError('Expected one start setting per message')
+
+        base = self.snapshot()
+        results = []
+
+        try:
+            for message, start in zip(messages, start_settings):
+                # Place the machine at the message's start
+                if isinstance(start, int):
+                    self.restore(base)
+                    self.advance(start)
+                else:
+                    self.restore(start)
+
+                # Translate a copy of the message in place
+                result = bytearray(message)
+                if result:
+                    with memoryview(result) as view:
+                        self._translateInto(view, view, engine)
+                results.append(result)
+
+        finally:
+            self.restore(base)
+
+        return results
+
     def translateString(self, s, **kwargs):
         """Lazy method to translate a string"""
         return str(self.translateChunk(bytes(s), **kwargs))
 
-    def _readChunks(self, stream, chunkSize):
-        """Yield discrete chunks from a stream."""
-        while True:
-            data = stream.read(chunkSize)
-            if not data:
-                break
-            yield data
+    def _readInto(self, stream, view):
+        """Fill a memoryview from a stream and return the bytes read."""
+        # Prefer reading directly into the buffer
+        readinto = getattr(stream, 'readinto', None)
+        if readinto:
+            return readinto(view) or 0
+
+        # Fall back to copying, for streams that can only read
+        data = stream.read(len(view))
+        view[:len(data)] = data
+        return len(data)
 
     def _streamSize(self, stream):
-        """Return the size of a stream in bytes"""
-        stream.seek(0, 2)
-        size = stream.tell()
-        stream.seek(0)
-        return size
+        """
+        Return the number of bytes left in a stream, or None for streams that
+        cannot seek, such as pipes.
+        """
+        try:
+            position = stream.tell()
+            size = stream.seek(0, 2)
+            stream.seek(position)
+        except (AttributeError, OSError, ValueError):
+            return None
+        return size - position
 
     def translateStream(
             self,
@@ -262,9 +582,28 @@ class Machine:
             stream_out=None,
             progressCallback=None,
             chunkSize=128,
+            compress=None,
+            decompress=False,
             **kwargs
             ):
-        """Translate a stream (file-like object) chunk by chunk."""
+        """
+        Translate a stream (file-like object) chunk by chunk.
+
+        A single buffer of `chunkSize` bytes is filled, translated in place,
+        and written out for every chunk, so no per-chunk allocations are made.
+
+        Without a `stream_out`, the whole result is collected in a BytesIO;
+        use `iterTranslate` to consume it a chunk at a time instead.
+
+        To encrypt compressible data, name a codec from `compression.codecs`
+        as `compress`; the input is compressed, behind a codec header, before
+        it is translated. Decrypt it with `decompress`, which decompresses
+        the translated output.
+        """
+        # Compress the input on its way in
+        if compress:
+            stream_in = compression.CompressReader(stream_in, compress)
+
         # Figure out the size of the input stream
         stream_in_size = self._streamSize(stream_in)
 
@@ -273,24 +612,443 @@ class Machine:
             stream_out = io.BytesIO()
         stream_out_size = 0
 
+        # Decompress the output on its way out
+        sink = stream_out
+        if decompress:
+            sink = compression.DecompressWriter(stream_out)
+
         # Make the initial call to the progress function
         if progressCallback:
             progressCallback(stream_out_size, stream_in_size)
 
+        # The reusable chunk buffer
+        buffer = memoryview(bytearray(chunkSize))
+
+        # Only time the stages if metrics are enabled
+        timed = self.metrics is not None
+
         # Iterate through chunks
-        for chunk_in in self._readChunks(stream_in, chunkSize):
-            chunk_out = self.translateChunk(chunk_in, **kwargs)
-            stream_out.write(chunk_out)
-            stream_out_size += chunkSize
+        while True:
+            if timed:
+                time_start = time.perf_counter_ns()
+
+            length = self._readInto(stream_in, buffer)
+            if not length:
+                break
+
+            if timed:
+                time_read = time.perf_counter_ns()
+
+            # Only a short read needs a narrower view of the buffer
+            chunk = buffer if length == chunkSize else buffer[:length]
+            self._translateInto(chunk, chunk, **kwargs)
+
+            if timed:
+                time_translate = time.perf_counter_ns()
+
+            sink.write(chunk)
+
+            if timed:
+                time_write = time.perf_counter_ns()
+                self.metrics.readNs += time_read - time_start
+                self.metrics.translateNs += time_translate - time_read
+                self.metrics.writeNs += time_write - time_translate
+
+            stream_out_size += length
             if progressCallback:
                 progressCallback(stream_out_size, stream_in_size)
 
+        # Check that the compressed data was complete
+        if decompress:
+            sink.close()
+
         # Return the outgoing stream (in case one wasn't passed in)
         return stream_out
 
+    def translatePipelined(
+            self,
+            stream_in,
+            stream_out,
+            progressCallback=None,
+            chunkSize=1024 ** 2,
+            depth=4,
+            compress=None,
+            decompress=False,
+            **kwargs
+            ):
+        """
+        Translate a stream with reading, translation and writing overlapped.
+
+        A reader thread fills buffers from `stream_in`, they are translated in
+        the calling thread, and a writer thread drains them to `stream_out`.
+        The stages pass a fixed ring of `depth` buffers of `chunkSize` bytes
+        between them, so memory use is bounded and the input is never sought;
+        pipes and sockets work as well as files. `compress` and `decompress`
+        behave as in `translateStream`. Returns the number of bytes
+        translated.
+        """
+        if compress:
+            stream_in = compression.CompressReader(stream_in, compress)
+        sink = stream_out
+        if decompress:
+            sink = compression.DecompressWriter(stream_out)
+
+        # Buffers cycle from free, to filled, to written, and back to free;
+        # a None in a queue tells the stage reading it to finish
+        free = queue.Queue()
+        filled = queue.Queue()
+        written = queue.Queue()
+        for _ in range(max(depth, 2)):
+            free.put(memoryview(bytearray(chunkSize)))
+
+        # The first error of any stage; the others wind down when one is set
+        failures = []
+        timed = self.metrics is not None
+
+        def read():
+            try:
+                while not failures:
+                    buffer = free.get()
+                    if buffer is None:
+                        break
+                    time_start = time.perf_counter_ns()
+                    length = self._readInto(stream_in, buffer)
+                    if timed:
+                        self.metrics.readNs += \
+                            time.perf_counter_ns() - time_start
+                    if not length:
+                        break
+                    filled.put((buffer, length))
+            except BaseException as error:
+                failures.append(error)
+            finally:
+                filled.put(None)
+
+        def write():
+            while True:
+                item = written.get()
+                if item is None:
+                    break
+                buffer, length = item
+
+                # After a failure buffers are only recycled, not written
+                if not failures:
+                    time_start = time.perf_counter_ns()
+                    try:
+                        with buffer[:length] as chunk:
+                            sink.write(chunk)
+                    except BaseException as error:
+                        # Wake the translation loop, which may be waiting
+                        # on a reader that is blocked in I/O
+                        failures.append(error)
+                        filled.put(None)
+                    if timed:
+                        self.metrics.writeNs += \
+                            time.perf_counter_ns() - time_start
+                free.put(buffer)
+
+        # Size the input before the reader starts moving through it
+        stream_in_size = self._streamSize(stream_in)
+        stream_out_size = 0
+
+        reader = threading.Thread(target=read, daemon=True)
+        writer = threading.Thread(target=write, daemon=True)
+        reader.start()
+        writer.start()
+
+        if progressCallback:
+            progressCallback(stream_out_size, stream_in_size)
+
+        try:
+            while True:
+                item = filled.get()
+                if item is None:
+                    break
+                buffer, length = item
+
+                if not failures:
+                    time_start = time.perf_counter_ns()
+                    with buffer[:length] as chunk:
+                        self._translateInto(chunk, chunk, **kwargs)
+                    if timed:
+                        self.metrics.translateNs += \
+                            time.perf_counter_ns() - time_start
+
+                    stream_out_size += length
+                    if progressCallback:
+                        progressCallback(stream_out_size, stream_in_size)
+
+                written.put(item)
+
+        except BaseException as error:
+            # Stop the reader at its next buffer, and the writer from writing
+            failures.append(error)
+            raise
+
+        finally:
+            # A reader waiting on a free buffer is told to stop instead. After
+            # a failure it is not waited for, as it may be blocked reading a
+            # pipe or socket; it stops once its read returns
+            free.put(None)
+            written.put(None)
+            writer.join()
+            if not failures:
+                reader.join()
+
+        if failures:
+            raise failures[0]
+
+        # Check that the compressed data was complete
+        if decompress:
+            sink.close()
+
+        return stream_out_size
+
+    def iterTranslate(self, buffers, chunkSize=None, reuse=False,
+                      engine='composite'):
+        """
+        Translate an iterable of bytes-like objects lazily, yielding each
+        translated chunk in turn.
+
+        Input is only pulled from `buffers` as the output is consumed, so it
+        composes with other generators; a stream can be fed in as
+        `iter(functools.partial(stream.read, size), b'')`. Buffers larger
+        than `chunkSize` are split, so at most one chunk is held at a time.
+
+        Each chunk is a new bytearray, unless `reuse` is set; then every
+        chunk is a memoryview of one shared buffer, only valid until the
+        next chunk is asked for.
+        """
+        # Checked here, so a bad size fails before anything is consumed
+        if chunkSize is not None and chunkSize <= 0:
+            raise ValueError('The chunk size must be positive')
+        return self._iterTranslate(buffers, chunkSize, reuse, engine)
+
+    def _iterTranslate(self, buffers, chunkSize, reuse, engine):
+        """The generator behind `iterTranslate`"""
+        output = None
+
+        for data in buffers:
+            with memoryview(data).cast('B') as view:
+                # Streams often hand over empty buffers; there is nothing
+                # to translate in them
+                if not len(view):
+                    continue
+                size = chunkSize or len(view)
+                for offset in range(0, len(view), size):
+                    with view[offset:offset + size] as chunk:
+                        count = len(chunk)
+                        if not reuse:
+                            result = bytearray(count)
+                            self._translateInto(chunk, result, engine)
+                            yield result
+                            continue
+
+                        # Grow the shared buffer to fit the chunk
+                        if output is None or len(output) < count:
+                            output = bytearray(max(count, size))
+                        with memoryview(output)[:count] as result:
+                            self._translateInto(chunk, result, engine)
+                            yield result
+
+    async def translateStreamAsync(
+            self,
+            reader,
+            writer,
+            chunkSize=64 * 1024,
+            offloadSize=4096,
+            executor=None,
+            **kwargs
+            ):
+        """
+        Translate an asyncio StreamReader into a StreamWriter chunk by chunk.
+
+        Chunks of at least `offloadSize` bytes are translated in `executor`
+        (the loop's default thread pool if None) so the event loop is not
+        blocked. The writer is drained after every chunk, so a slow consumer
+        slows the reading down. Returns the number of bytes translated.
+        """
+        loop = asyncio.get_running_loop()
+        total = 0
+
+        while True:
+            data = await reader.read(chunkSize)
+            if not data:
+                break
+
+            chunk = bytearray(data)
+            if len(chunk) >= offloadSize:
+                translate = functools.partial(
+                    self.translateInto, chunk, chunk, **kwargs
+                )
+                await loop.run_in_executor(executor, translate)
+            else:
+                self.translateInto(chunk, chunk, **kwargs)
+
+            writer.write(chunk)
+            await writer.drain()
+            total += len(chunk)
+
+        return total
+
+    def translateFile(
+            self,
+            path_in,
+            path_out=None,
+            in_place=False,
+            windowSize=16 * 1024 ** 2,
+            progressCallback=None,
+            **kwargs
+            ):
+        """
+        Translate a file through memory maps, one window at a time.
+
+        With `in_place` the file at `path_in` is overwritten with its
+        translation, so no extra disk space is needed. Otherwise the result
+        is written to `path_out`; naming the input again translates it in
+        place. Only one window is mapped at a time.
+        """
+        if not in_place and not path_out:
+            raise ValueError('An output path is required unless in_place')
+
+        # Opening the output would truncate an input that is the same file
+        if not in_place and os.path.exists(path_out) and \
+                os.path.samefile(path_in, path_out):
+            in_place = True
+
+        # Windows must start on a multiple of the mapping granularity
+        granularity = mmap.ALLOCATIONGRANULARITY
+        windowSize = max(-(-windowSize // granularity), 1) * granularity
+
+        size = os.path.getsize(path_in)
+        stream_in = open(path_in, 'r+b' if in_place else 'rb')
+        stream_out = stream_in
+
+        # Create the output file at its final size
+        if not in_place:
+            stream_out = open(path_out, 'w+b')
+            stream_out.truncate(size)
+
+        # Make the initial call to the progress function
+        if progressCallback:
+            progressCallback(0, size)
+
+        try:
+            for offset in range(0, size, windowSize):
+                length = min(windowSize, size - offset)
+
+                # Map the window of the output, and the input if separate
+                window_out = mmap.mmap(
+                    stream_out.fileno(), length, offset=offset
+                )
+                window_in = window_out
+                if not in_place:
+                    window_in = mmap.mmap(
+                        stream_in.fileno(), length,
+                        access=mmap.ACCESS_READ, offset=offset
+                    )
+
+                self.translateInto(window_in, window_out, **kwargs)
+
+                window_in.close()
+                window_out.close()
+
+                if progressCallback:
+                    progressCallback(offset + length, size)
+
+        finally:
+            stream_in.close()
+            stream_out.close()
+
+
+class SeedStream:
+    """
+    Deterministic source of random numbers derived from a seed.
+
+    Numbers are drawn from the SHAKE-256 output of the seed, so the same seed
+    gives the same numbers on every platform and Python version, and
+    separate streams share no state. Not a CSPRNG API; it only derives
+    machine layouts.
+    """
+
+    # Domain prefix, so these bytes never coincide with another SHAKE use
+    _domain = b'bitnigma.SeedStream.v1\x00'
+
+    def __init__(self, seed, index=0):
+        """Start the stream for a bytes seed, and a family index."""
+        self._shake = hashlib.shake_256(
+            self._domain + index.to_bytes(8, 'big') + seed
+        )
+        self._buffer = b''
+        self._position = 0
+
+    def _fill(self, stop):
+        """Make sure the first `stop` bytes of the stream are buffered."""
+        if stop > len(self._buffer):
+            # SHAKE output is a prefix of any longer output
+            self._buffer = self._shake.digest(
+                max(stop, 2 * len(self._buffer), 512)
+            )
+
+    def read(self, count):
+        """Take the next `count` bytes of the stream."""
+        stop = self._position + count
+        self._fill(stop)
+        data = self._buffer[self._position:stop]
+        self._position = stop
+        return data
+
+    def below(self, n):
+        """Draw a uniform integer 0 <= i < n, by rejection sampling."""
+        size = max((n - 1).bit_length() + 7 >> 3, 1)
+        span = 256 ** size
+        limit = span - span % n
+        while True:
+            value = int.from_bytes(self.read(size), 'big')
+            if value < limit:
+                return value % n
+
+    def between(self, low, high):
+        """Draw a uniform integer low <= i <= high."""
+        return low + self.below(high - low + 1)
+
+    def permutation(self):
+        """
+        Draw a uniform permutation of the 256 byte values; a Fisher-Yates
+        shuffle where each swap index is `below(i + 1)`.
+        """
+        values = bytearray(range(256))
+
+        # The same single byte draws as `below`, without the calls
+        buffer = self._buffer
+        position = self._position
+        for i in range(255, 0, -1):
+            limit = 256 - 256 % (i + 1)
+            while True:
+                if position == len(buffer):
+                    self._fill(position + 1)
+                    buffer = self._buffer
+                value = buffer[position]
+                position += 1
+                if value < limit:
+                    break
+            j = value % (i + 1)
+            values[i], values[j] = values[j], values[i]
+
+        self._position = position
+        return values
+
 
 class RandomMachine(Machine):
-    """Bitnigma machine randomly generated from a string seed."""
+    """
+    Bitnigma machine randomly generated from a seed.
+
+    Every choice comes from a private `SeedStream` of the seed, in this
+    order; the plug count and a permutation whose leading pairs are the
+    plugs, then for each rotor its wiring permutation, notch count, a
+    permutation whose leading bytes are the notches, and its setting, and
+    finally a permutation whose consecutive pairs are the reflector wiring.
+    """
 
     # Arbitrarily chosen default parameters of random generation
     _defaultconfig = {
@@ -301,50 +1059,61 @@ class RandomMachine(Machine):
         'rotor_notch_max': 3
     }
 
-    def __init__(self, seed_string=None, seed_file=None, override={}):
-        """Initialize the random machine."""
-        # Seed the random generator
+    def __init__(self, seed_string=None, seed_file=None, override={},
+                 index=0):
+        """
+        Initialize the random machine from a seed string (or bytes), or the
+        contents of a seed file path or object. Each `index` selects a
+        different machine of the family generated by the same seed.
+        """
+        # Get the seed bytes
         if seed_string:
-            random.seed(seed_string)
+            seed = seed_string
+            if isinstance(seed, str):
+                seed = seed.encode()
         elif seed_file:
-            seed_obj = seed_file
             if isinstance(seed_file, str):
-                seed_obj = open(seed_file, 'rb')
-            random.seed(seed_obj.read())
+                with open(seed_file, 'rb') as seed_obj:
+                    seed = seed_obj.read()
+            else:
+                seed = seed_file.read()
         else:
             raise RuntimeError('No seed given to RandomMachine')
+        stream = SeedStream(seed, index)
 
         # Figure out the config params
         config = self._defaultconfig.copy()
         config.update(override)
 
         # Generate a random plugboard
-        random_plugboard = []
-        population_plugboard = {i for i in range(256)}
-        for i in range(random.randint(config['plugs_min'], config['plugs_max'])):
-            pair = [x, y] = random.sample(population_plugboard, 2)
-            [population_plugboard.remove(z) for z in pair]
-            random_plugboard.append(pair)
+        plugs = stream.between(config['plugs_min'], config['plugs_max'])
+        population = stream.permutation()
+        random_plugboard = [
+            population[i:i + 2] for i in range(0, plugs * 2, 2)
+        ]
 
         # Generate random rotors
         random_rotors = []
-        population_rotors = bytes([i for i in range(256)])
         for i in range(config['rotor_count']):
+            wiring = stream.permutation()
+            notch_count = stream.between(
+                config['rotor_notch_min'],
+                config['rotor_notch_max']
+            )
+            notches = stream.permutation()[:notch_count]
             random_rotors.append(rotors.Custom(
-                wiring=bytearray(random.sample(population_rotors, 256)),
-                notches=random.sample(population_rotors, random.randint(config['rotor_notch_min'], config['rotor_notch_max'])),
-                setting=random.randint(0, 255)
+                wiring=wiring,
+                notches=notches,
+                setting=stream.below(256)
             ))
 
         # Pick a random reflector
-        population_reflector = {i for i in range(256)}
-        reflector_wiring = [None for i in range(256)]
-        for i in range(128):
-            pair = [x, y] = random.sample(population_reflector, 2)
-            [population_reflector.remove(z) for z in pair]
+        population = stream.permutation()
+        reflector_wiring = bytearray(256)
+        for x, y in zip(population[0::2], population[1::2]):
             reflector_wiring[x] = y
             reflector_wiring[y] = x
-        random_reflector = reflectors.Custom(wiring=bytearray(reflector_wiring))
+        random_reflector = reflectors.Custom(wiring=reflector_wiring)
 
         # Initialize actual machine
         super().__init__(random_plugboard, random_rotors, random_reflector)
@@ -0,0 +1,114 @@
+# stdlib imports
+
+# third party imports
+
+# local module imports
+
+
+class Metrics:
+    """
+    Counters and timers of the translation work done by a machine.
+
+    Counters are updated once per chunk rather than once per byte; the rotor
+    steps of a chunk are worked out from the notches in the same way as
+    `rotors._Base.advance`.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Zero every counter and timer."""
+        self.bytes = 0
+        self.chunks = 0
+
+        # Per rotor; how often it stepped, and how often it hit a notch
+        self.rotorSteps = []
+        self.rotorTurnovers = []
+
+        # Deepest rotor a stepping cascade has reached (1 = first rotor)
+        self.cascadeMax = 0
+
+        # Time spent in each stage of `Machine.translateStream` (or of
+        # `Machine.translatePipelined`, where the stages overlap)
+        self.readNs = 0
+        self.translateNs = 0
+        self.writeNs = 0
+
+    def recordChunk(self, rotorStack, count):
+        """
+        Record a chunk of `count` bytes, before it is translated by a machine
+        with the given rotors.
+        """
+        self.bytes += count
+        self.chunks += 1
+
+        # Make room for every rotor of the machine
+        missing = len(rotorStack) - len(self.rotorSteps)
+        if missing > 0:
+            self.rotorSteps.extend([0] * missing)
+            self.rotorTurnovers.extend([0] * missing)
+
+        # Cascade the steps through the stack, starting from the settings
+        # the rotors are at before the chunk
+        steps = count
+        for i, rotor in enumerate(rotorStack):
+            if not steps:
+                break
+            turnovers = rotor.turnovers(steps)
+            self.rotorSteps[i] += steps
+            self.rotorTurnovers[i] += turnovers
+            self.cascadeMax = max(self.cascadeMax, i + 1)
+            steps = turnovers
+
+    def asDict(self):
+        """Export the metrics as a plain dictionary."""
+        return {
+            'bytes': self.bytes,
+            'steps': self.rotorSteps[0] if self.rotorSteps else 0,
+            'chunks': self.chunks,
+            'rotor_steps': list(self.rotorSteps),
+            'rotor_turnovers': list(self.rotorTurnovers),
+            'cascade_max': self.cascadeMax,
+            'read_ns': self.readNs,
+            'translate_ns': self.translateNs,
+            'write_ns': self.writeNs
+        }
+
+    def toPrometheus(self, prefix='bitnigma'):
+        """Export the metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, description, samples):
+            name = prefix + '_' + name
+            lines.append('# HELP {0} {1}'.format(name, description))
+            lines.append('# TYPE {0} {1}'.format(name, kind))
+            for labels, value in samples:
+                lines.append('{0}{1} {2}'.format(name, labels, value))
+
+        metric('bytes_translated_total', 'counter',
+               'Bytes translated by the machine.', [('', self.bytes)])
+        metric('steps_total', 'counter',
+               'Steps of the machine, one per byte translated.',
+               [('', self.rotorSteps[0] if self.rotorSteps else 0)])
+        metric('chunks_total', 'counter',
+               'Chunks translated by the machine.', [('', self.chunks)])
+        metric('rotor_steps_total', 'counter',
+               'Steps taken by each rotor.',
+               [('{{rotor="{0}"}}'.format(i), n)
+                for i, n in enumerate(self.rotorSteps)])
+        metric('rotor_turnovers_total', 'counter',
+               'Notch turnovers of each rotor into the next one.',
+               [('{{rotor="{0}"}}'.format(i), n)
+                for i, n in enumerate(self.rotorTurnovers)])
+        metric('cascade_depth_max', 'gauge',
+               'Deepest rotor reached by a stepping cascade.',
+               [('', self.cascadeMax)])
+        metric('stream_seconds_total', 'counter',
+               'Time spent in each stage of stream translation.',
+               [('{{stage="{0}"}}'.format(stage), ns / 1e9)
+                for stage, ns in (('read', self.readNs),
+                                  ('translate', self.translateNs),
+                                  ('write', self.writeNs))])
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,259 @@
+# stdlib imports
+import collections
+import concurrent.futures
+import itertools
+import os
+from multiprocessing import shared_memory
+
+# third party imports
+
+# local module imports
+import bitnigma.codebook as bitcodebook
+
+
+# Per-process state of a pool worker, filled in by `_workerInit` or
+# `_taskInit`
+_worker = {}
+
+
+def _workerInit(machine, name_in, name_out, kwargs, path=None):
+    """Set up a worker process with its own machine and the shared buffers."""
+    # Machines from a codebook are mapped from it at their snapshot
+    if path is not None:
+        book = bitcodebook.Codebook(path)
+        snapshot, machine = machine, book.machine()
+        machine.restore(snapshot)
+        _worker['codebook'] = book
+
+    _worker['machine'] = machine
+    _worker['base'] = machine.snapshot()
+    _worker['input'] = shared_memory.SharedMemory(name=name_in)
+    _worker['output'] = shared_memory.SharedMemory(name=name_out)
+    _worker['kwargs'] = kwargs
+
+
+def _workerTranslate(start, length, offset):
+    """
+    Translate `length` bytes at `start` of the shared input buffer into the
+    shared output buffer. The first byte is at keystream `offset`.
+    """
+    machine = _worker['machine']
+
+    # Return to the base settings, then jump to the offset
+    machine.restore(_worker['base'])
+    machine.advance(offset)
+
+    stop = start + length
+    with _worker['input'].buf[start:stop] as chunk_in, \
+            _worker['output'].buf[start:stop] as chunk_out:
+        machine.translateInto(chunk_in, chunk_out, **_worker['kwargs'])
+
+    return length
+
+
+def _taskInit(setup, args):
+    """Set up a worker process of `mapTasks`."""
+    _worker['context'] = setup(*args)
+
+
+def _taskBatch(function, tasks):
+    """Run a batch of `mapTasks` tasks in a worker process."""
+    context = _worker['context']
+    return [function(context, task) for task in tasks]
+
+
+def mapTasks(function, tasks, setup, args=(), jobs=None, batchSize=1):
+    """
+    Run `function(context, task)` for every task, yielding the results in
+    order. The context is what `setup(*args)` returns, called once in each
+    process that runs tasks.
+
+    With `jobs` of 1 or less the tasks run in this process; otherwise in a
+    pool of `jobs` worker processes, by default one per CPU. Tasks are sent
+    in batches of `batchSize`, and only a few batches per worker are in
+    flight at a time, so `tasks` may be a long iterator. The pool is shut
+    down when the generator is exhausted or closed.
+    """
+    if jobs is not None and jobs <= 1:
+        context = setup(*args)
+        for task in tasks:
+            yield function(context, task)
+        return
+
+    jobs = jobs or os.cpu_count() or 1
+    tasks = iter(tasks)
+    pending = collections.deque()
+    pool = concurrent.futures.ProcessPoolExecutor(
+        jobs,
+        initializer=_taskInit,
+        initargs=(setup, args)
+    )
+
+    try:
+        while True:
+            # Keep a window of batches in flight, collected in order
+            while len(pending) < jobs * 4:
+                batch = list(itertools.islice(tasks, batchSize))
+                if not batch:
+                    break
+                pending.append(pool.submit(_taskBatch, function, batch))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown()
+
+
+class WorkerPool:
+    """
+    Persistent pool of worker processes that translate through shared memory.
+
+    Each worker rebuilds the machine once, as it was when the pool was
+    created. Data moves through a pair of shared buffers, so the only thing
+    sent per chunk is its (start, length, offset) descriptor.
+    """
+
+    def __init__(
+            self,
+            machine,
+            jobs=None,
+            windowSize=16 * 1024 ** 2,
+            chunkSize=256 * 1024,
+            codebook=None,
+            **kwargs
+            ):
+        """
+        Start the worker processes and allocate the shared buffers. If the
+        machine was built from a `Codebook`, passing it lets the workers map
+        its tables rather than compiling their own.
+        """
+        self.jobs = jobs or os.cpu_count() or 1
+        self.windowSize = windowSize
+        self.chunkSize = chunkSize
+
+        self._input = shared_memory.SharedMemory(create=True, size=windowSize)
+        self._output = shared_memory.SharedMemory(create=True, size=windowSize)
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            self.jobs,
+            initializer=_workerInit,
+            initargs=(
+                machine if codebook is None else machine.snapshot(),
+                self._input.name,
+                self._output.name,
+                kwargs,
+                None if codebook is None else codebook.path
+            )
+        )
+
+    @property
+    def input(self):
+        """The shared input buffer, as a memoryview."""
+        return self._input.buf
+
+    @property
+    def output(self):
+        """The shared output buffer, as a memoryview."""
+        return self._output.buf
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the workers and free the shared buffers."""
+        self._pool.shutdown()
+        for block in (self._input, self._output):
+            block.close()
+            block.unlink()
+
+    def translateWindow(self, length, offset):
+        """
+        Translate the first `length` bytes of the input buffer into the
+        output buffer. The first byte is at keystream `offset`, counted from
+        the machine's settings when the pool was created.
+        """
+        starts = range(0, length, self.chunkSize)
+        lengths = [min(self.chunkSize, length - start) for start in starts]
+        offsets = [offset + start for start in starts]
+
+        # Send the descriptors over in batches to keep IPC to a minimum
+        batch = max(len(starts) // (self.jobs * 4), 1)
+        for _ in self._pool.map(
+                _workerTranslate, starts, lengths, offsets, chunksize=batch):
+            pass
+
+    def translateStream(
+            self,
+            stream_in,
+            stream_out,
+            offset=0,
+            progressCallback=None,
+            total=None
+            ):
+        """
+        Translate a stream window by window, starting at keystream `offset`.
+        Returns the number of bytes translated.
+        """
+        done = 0
+
+        # Make the initial call to the progress function
+        if progressCallback:
+            progressCallback(done, total)
+
+        while True:
+            with self._input.buf[:self.windowSize] as window:
+                length = stream_in.readinto(window)
+            if not length:
+                break
+
+            self.translateWindow(length, offset + done)
+
+            with self._output.buf[:length] as window:
+                stream_out.write(window)
+
+            done += length
+            if progressCallback:
+                progressCallback(done, total)
+
+        return done
+
+
+def translateFile(
+        machine,
+        path_in,
+        path_out,
+        jobs=None,
+        chunkSize=256 * 1024,
+        windowSize=16 * 1024 ** 2,
+        progressCallback=None,
+        **kwargs
+        ):
+    """
+    Translate a file into another using a pool of worker processes.
+
+    The output is identical to `Machine.translateStream`, and the machine is
+    left in the same final state.
+    """
+    # Opening the output would destroy an in-place input
+    if os.path.exists(path_out) and os.path.samefile(path_in, path_out):
+        raise ValueError('Input and output must be different files')
+
+    size = os.path.getsize(path_in)
+
+    with open(path_in, 'rb') as stream_in, \
+            open(path_out, 'wb') as stream_out, \
+            WorkerPool(machine, jobs, windowSize, chunkSize, **kwargs) as pool:
+        done = pool.translateStream(
+            stream_in,
+            stream_out,
+            progressCallback=progressCallback,
+            total=size
+        )
+
+    # Leave the machine where a serial translation would have
+    machine.advance(done)
@@ -0,0 +1,73 @@
+# stdlib imports
+import asyncio
+
+# third party imports
+
+# local module imports
+import bitnigma.machine as bitmachine
+
+
+async def _pipe(machine, reader, writer, **kwargs):
+    """Translate everything from a reader into a writer, then pass on EOF."""
+    await machine.translateStreamAsync(reader, writer, **kwargs)
+    if writer.can_write_eof():
+        writer.write_eof()
+
+
+async def _handle(state, upstreamHost, upstreamPort, reader, writer,
+                  **kwargs):
+    """Forward one client connection to the upstream server."""
+    try:
+        upstream_reader, upstream_writer = await asyncio.open_connection(
+            upstreamHost, upstreamPort
+        )
+    except OSError:
+        writer.close()
+        return
+
+    # Enigma translation is its own inverse, so encrypting one direction and
+    # decrypting the other only needs an independent machine for each
+    try:
+        await asyncio.gather(
+            _pipe(
+                bitmachine.Machine(state=state),
+                reader, upstream_writer, **kwargs
+            ),
+            _pipe(
+                bitmachine.Machine(state=state),
+                upstream_reader, writer, **kwargs
+            )
+        )
+    except ConnectionError:
+        pass
+    finally:
+        upstream_writer.close()
+        writer.close()
+
+
+async def serve(state, listenHost, listenPort, upstreamHost, upstreamPort,
+                **kwargs):
+    """
+    Run a TCP forwarder that translates traffic in both directions.
+
+    Every accepted connection gets its own pair of machines, started from
+    `state`. Extra keyword arguments go to `Machine.translateStreamAsync`.
+    """
+    # The event loop only keeps weak references to tasks, and a connection
+    # waiting on a half-closed socket may be referenced by nothing else
+    connections = set()
+
+    async def handler(reader, writer):
+        task = asyncio.current_task()
+        connections.add(task)
+        try:
+            await _handle(
+                state, upstreamHost, upstreamPort, reader, writer, **kwargs
+            )
+        finally:
+            connections.discard(task)
+
+    server = await asyncio.start_server(handler, listenHost, listenPort)
+
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,273 @@
+# stdlib imports
+import hashlib
+import itertools
+import json
+import time
+
+# third party imports
+
+# local module imports
+import bitnigma.io as bitio
+import bitnigma.machine as bitmachine
+import bitnigma.parallel as parallel
+import bitnigma.vectorized as vectorized
+
+
+# Version of the checkpoint document
+_checkpointVersion = 1
+
+# Largest search space; candidates are numbered with 64 bit integers
+_maxCandidates = 2 ** 62
+
+
+def parseSpace(machine, specs=(), vary=None):
+    """
+    Build a search space for a machine; a list with the candidate settings
+    of each rotor.
+
+    Rotors from index `vary` onwards keep their current settings, and the
+    others may be anything, unless `specs` says otherwise. Each spec is
+    'INDEX=VALUES', where VALUES is a comma separated list of settings and
+    LOW-HIGH ranges, such as '0=0x10-0x1f' or '2=7,9'.
+    """
+    count = len(machine.rotors)
+    space = [list(range(256)) for i in range(count)]
+    if vary is not None:
+        for i in range(vary, count):
+            space[i] = [machine.rotors[i].setting]
+
+    for spec in specs:
+        index, _, values = spec.partition('=')
+        try:
+            index = int(index, 0)
+            settings = []
+            for part in values.split(','):
+                low, _, high = part.partition('-')
+                low = int(low, 0)
+                high = int(high, 0) if high else low
+                settings.extend(range(low, high + 1))
+        except ValueError:
+            raise ValueError('Malformed rotor spec ' + spec)
+        if not 0 <= index < count:
+            raise ValueError('No rotor {0} in {1} rotors'.format(index, count))
+        if not settings or min(settings) < 0 or max(settings) > 255:
+            raise ValueError('Rotor settings must be from 0 to 255: ' + spec)
+        space[index] = sorted(set(settings))
+
+    return space
+
+
+def spaceSize(space):
+    """Number of candidate settings in a search space."""
+    size = 1
+    for settings in space:
+        size *= len(settings)
+    return size
+
+
+def candidate(space, index):
+    """Return the rotor settings of the `index`th candidate of a space."""
+    settings = []
+    for choices in space:
+        index, digit = divmod(index, len(choices))
+        settings.append(choices[digit])
+    return tuple(settings)
+
+
+def _setup(state, crib, target, space):
+    """Build the tables of the machine a process tests candidates with."""
+    numpy = vectorized.numpy
+    machine = bitmachine.Machine(state=state)
+
+    return {
+        'plugboard': numpy.frombuffer(machine.plugboard, dtype=numpy.uint8),
+        'reflector': numpy.frombuffer(
+            machine.reflector.initial_wiring, dtype=numpy.uint8
+        ),
+        'tables': [vectorized.rotorTables(rotor) for rotor in machine.rotors],
+        'notches': [
+            numpy.frombuffer(rotor.notches, dtype=numpy.uint8).astype(bool)
+            for rotor in machine.rotors
+        ],
+        'choices': [
+            numpy.array(choices, dtype=numpy.uint8) for choices in space
+        ],
+        'crib': bytes(crib),
+        'target': bytes(target)
+    }
+
+
+def _searchUnit(worker, unit):
+    """
+    Test the candidates numbered from `start` to `stop`. Returns the numbers
+    of those that translate the crib into the target.
+    """
+    start, stop = unit
+    numpy = vectorized.numpy
+    plugboard = worker['plugboard']
+    reflector = worker['reflector']
+    tables = worker['tables']
+    notches = worker['notches']
+
+    # The settings of every candidate, one array per rotor
+    numbers = numpy.arange(start, stop, dtype=numpy.int64)
+    settings = []
+    stride = 1
+    for choices in worker['choices']:
+        settings.append(choices[(numbers // stride) % len(choices)])
+        stride *= len(choices)
+
+    last = len(worker['crib']) - 1
+    for i, (pin, expected) in enumerate(zip(worker['crib'],
+                                            worker['target'])):
+        # Translate this crib byte at every candidate's settings
+        pins = tables[0][0][settings[0], plugboard[pin]]
+        for (forward, _), setting in zip(tables[1:], settings[1:]):
+            pins = forward[setting, pins]
+        pins = reflector[pins]
+        for (_, reverse), setting in zip(tables[::-1], settings[::-1]):
+            pins = reverse[setting, pins]
+        hits = plugboard[pins] == expected
+
+        # Drop every candidate on its first mismatching byte
+        if not hits.all():
+            numbers = numbers[hits]
+            if not len(numbers):
+                break
+            settings = [setting[hits] for setting in settings]
+
+        if i == last:
+            break
+
+        # Step the surviving candidates like an odometer
+        carry = None
+        for j, setting in enumerate(settings):
+            if carry is None:
+                setting += 1
+            else:
+                setting += carry
+            carry = notches[j][setting] if carry is None else \
+                carry & notches[j][setting]
+            if not carry.any():
+                break
+
+    return numbers.tolist()
+
+
+def _searchKey(state, crib, target, space, batchSize):
+    """Identify a search, so a checkpoint is only resumed by the same one"""
+    digest = hashlib.blake2s()
+    digest.update(state)
+    digest.update(len(crib).to_bytes(8, 'big'))
+    digest.update(crib)
+    digest.update(target)
+    digest.update(json.dumps([space, batchSize]).encode())
+    return digest.hexdigest()
+
+
+def _readCheckpoint(path, key):
+    """Load the progress of a search, if a checkpoint of it exists"""
+    try:
+        with open(path, 'r') as file:
+            document = json.load(file)
+    except FileNotFoundError:
+        return 0, []
+    if document.get('version') != _checkpointVersion:
+        raise ValueError('Unsupported checkpoint version')
+    if document.get('search') != key:
+        raise ValueError('Checkpoint is for another search')
+    return document['units_done'], document['matches']
+
+
+def _writeCheckpoint(path, key, done, matches):
+    """Save the progress of a search, replacing the checkpoint atomically"""
+    with bitio.atomicWrite(path, 'w') as file:
+        json.dump({
+            'version': _checkpointVersion,
+            'search': key,
+            'units_done': done,
+            'matches': matches
+        }, file)
+
+
+def search(
+        state,
+        crib,
+        ciphertext,
+        space=None,
+        jobs=None,
+        batchSize=1024 ** 2,
+        progressCallback=None,
+        checkpoint=None,
+        checkpointInterval=5.0
+        ):
+    """
+    Find the rotor settings that a known plaintext (the crib) was encrypted
+    from, given the start of its ciphertext.
+
+    Every candidate of `space` (see `parseSpace`; by default every setting
+    of every rotor) is tested, in batches of `batchSize` candidates spread
+    over `jobs` worker processes. Each batch is translated a byte at a time
+    with NumPy, dropping candidates on their first mismatching byte, so the
+    crib costs little more than its first byte. Requires NumPy.
+
+    With a `checkpoint` path, progress is saved there every
+    `checkpointInterval` seconds, and a search started again with the same
+    arguments resumes from it. Returns the matching settings tuples in
+    order; a longer crib leaves fewer false matches.
+    """
+    vectorized._require()
+    if isinstance(state, bitmachine.Machine):
+        state = state.stateGet()
+    crib = bytes(crib)
+    target = bytes(ciphertext[:len(crib)])
+    if not crib:
+        raise ValueError('The crib must not be empty')
+    if len(target) < len(crib):
+        raise ValueError('The ciphertext is shorter than the crib')
+
+    if space is None:
+        space = parseSpace(bitmachine.Machine(state=state))
+    space = [[int(setting) for setting in choices] for choices in space]
+    total = spaceSize(space)
+    if total > _maxCandidates:
+        raise ValueError('Search space is too large; fix some rotors')
+    units = [(start, min(start + batchSize, total))
+             for start in range(0, total, batchSize)]
+
+    # Pick up where a checkpoint left off
+    key = _searchKey(state, crib, target, space, batchSize)
+    done, matches = 0, []
+    if checkpoint:
+        done, matches = _readCheckpoint(checkpoint, key)
+    saved = time.monotonic()
+
+    if progressCallback:
+        progressCallback(units[done - 1][1] if done else 0, total)
+
+    results = parallel.mapTasks(
+        _searchUnit,
+        itertools.islice(units, done, None),
+        _setup,
+        (state, crib, target, space),
+        jobs=jobs
+    )
+
+    try:
+        for found in results:
+            done, matches = done + 1, matches + found
+
+            if progressCallback:
+                progressCallback(units[done - 1][1], total)
+            if checkpoint and (done == len(units) or
+                               time.monotonic() - saved >= checkpointInterval):
+                _writeCheckpoint(checkpoint, key, done, matches)
+                saved = time.monotonic()
+
+    finally:
+        # Keep the progress of an interrupted search
+        results.close()
+        if checkpoint and done < len(units):
+            _writeCheckpoint(checkpoint, key, done, matches)
+
+    return [candidate(space, number) for number in matches]
@@ -0,0 +1,170 @@
+# stdlib imports
+
+# third party imports
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# local module imports
+
+
+# Largest slice of a chunk translated in one pass
+_sliceSize = 256 * 1024
+
+
+def available():
+    """Return True if NumPy is installed and the engine can be used."""
+    return numpy is not None
+
+
+def _require():
+    """Raise an error if NumPy is not installed."""
+    if numpy is None:
+        raise RuntimeError('The vectorized engine requires NumPy')
+
+
+def _tables(wiring_forward, wiring_reverse):
+    """
+    Build the per-setting permutation tables of a rotor.
+
+    Both arguments are a rotor's signed 'h' wiring buffers.
+    Returns a pair of 256x256 uint8 arrays, indexed as [setting, pin], that
+    give the result of a forward and a reverse pass through the rotor.
+    """
+    pins = numpy.arange(256, dtype=numpy.int64)
+    offsets = (pins[None, :] + pins[:, None]) % 256
+
+    # Absolute wirings, recovered from the relative offsets
+    forward = (pins + numpy.frombuffer(wiring_forward, dtype='h')) % 256
+    reverse = (pins + numpy.frombuffer(wiring_reverse, dtype='h')) % 256
+
+    # Row `s` is the wiring shifted by the rotor setting `s`
+    table_forward = (forward[offsets] - pins[:, None]) % 256
+    table_reverse = (reverse[offsets] - pins[:, None]) % 256
+    return (
+        table_forward.astype(numpy.uint8),
+        table_reverse.astype(numpy.uint8)
+    )
+
+
+def rotorTables(rotor):
+    """
+    Return the (forward, reverse) per-setting tables of a rotor. They are
+    built once, and kept on the compiled tables its wiring shares.
+    """
+    _require()
+    compiled = rotor.tables
+    if compiled._pinArrays is not None:
+        return compiled._pinArrays
+
+    # Tables mapped from a codebook already hold every setting
+    block = compiled._pinBlock
+    if block is not None:
+        tables = numpy.frombuffer(block, dtype=numpy.uint8)
+        arrays = tables[:65536].reshape(256, 256), \
+            tables[65536:].reshape(256, 256)
+    else:
+        arrays = _tables(compiled.wiring_forward, compiled.wiring_reverse)
+
+    compiled._pinArrays = arrays
+    return arrays
+
+
+def settingSequence(rotor_stack, count):
+    """
+    Compute the rotor settings used for each of the next `count` pins.
+
+    Replays the odometer stepping of `rotors._Base.step` for the whole
+    sequence at once. Returns a list with one uint8 array of length `count`
+    per rotor, and a list of the settings each rotor ends on.
+    """
+    _require()
+    sequences = []
+    final = []
+
+    # The first rotor steps after every pin
+    steps = numpy.ones(count, dtype=numpy.int64)
+
+    for rotor in rotor_stack:
+        start = rotor.setting
+
+        # Once a rotor stops moving, every rotor after it stands still too
+        if steps is None:
+            sequences.append(numpy.full(count, start, dtype=numpy.uint8))
+            final.append(start)
+            continue
+
+        # Setting of the rotor after each pin has been processed
+        after = (start + numpy.cumsum(steps)) % 256
+
+        # The setting used for a pin is the one before its own step
+        sequences.append(((after - steps) % 256).astype(numpy.uint8))
+        final.append(int(after[-1]))
+
+        # The next rotor steps whenever this one stepped onto a notch
+        notches = numpy.frombuffer(rotor.notches, dtype=numpy.uint8)
+        steps = steps * notches[after]
+        if not steps.any():
+            steps = None
+
+    return sequences, final
+
+
+def translateInto(machine, chunk_in, chunk_out):
+    """
+    Translate a bytes-like object through the machine in one vectorized pass,
+    writing the result into the writable buffer `chunk_out`.
+
+    The output, and the state the machine is left in, are identical to
+    calling `Machine.translatePin` once for each byte.
+    """
+    _require()
+
+    # Large chunks go through in slices, so the per-pin temporaries stay
+    # bounded; the rotors carry on from one slice to the next
+    count = len(chunk_in)
+    if count > _sliceSize:
+        with memoryview(chunk_in).cast('B') as view_in, \
+                memoryview(chunk_out).cast('B') as view_out:
+            for start in range(0, count, _sliceSize):
+                stop = min(start + _sliceSize, count)
+                with view_in[start:stop] as slice_in, \
+                        view_out[start:stop] as slice_out:
+                    translateInto(machine, slice_in, slice_out)
+        return
+
+    # Nothing to do for an empty chunk
+    if not count:
+        return
+
+    plugboard = numpy.frombuffer(machine.plugboard, dtype=numpy.uint8)
+    reflector = numpy.frombuffer(
+        machine.reflector.initial_wiring,
+        dtype=numpy.uint8
+    )
+    tables = [rotorTables(rotor) for rotor in machine.rotors]
+    sequences, final = settingSequence(machine.rotors, count)
+
+    # Forward through the plugboard
+    pins = plugboard[numpy.frombuffer(chunk_in, dtype=numpy.uint8)]
+
+    # Forward through the rotors
+    for (forward, _), setting in zip(tables, sequences):
+        pins = forward[setting, pins]
+
+    # Bounce off the reflector
+    pins = reflector[pins]
+
+    # Back through the rotors
+    for (_, reverse), setting in zip(tables[::-1], sequences[::-1]):
+        pins = reverse[setting, pins]
+
+    # Backwards through the plugboard
+    pins = plugboard[pins]
+
+    # Leave the rotors where the per-pin path would have
+    for rotor, setting in zip(machine.rotors, final):
+        rotor.setting = setting
+
+    numpy.frombuffer(chunk_out, dtype=numpy.uint8)[:count] = pins
@@ -34,12 +34,17 @@ setuptools.setup(
     license='MIT',
     packages=['bitnigma'],
     install_requires=['click', 'colorama'],
+    extras_require={'numpy': ['numpy']},
+    python_requires='>=3.8',
     classifiers=[
         'Environment :: Console',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.6'
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11'
     ]
 )